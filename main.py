@@ -9,8 +9,10 @@ import os
 import sys
 from pathlib import Path
 
+import orjson
 from dotenv import load_dotenv
 from flask import Flask, render_template
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_socketio import SocketIO
 
@@ -22,22 +24,48 @@ sys.path.insert(0, str(BASE_DIR))        # make local imports reliable
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
-logger = logging.getLogger(__name__)
+DEBUG = os.getenv("FLASK_ENV") == "development"
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
+logger = logging.getLogger(__name__)
 
 # Suppress verbose socketio/engineio logs
 logging.getLogger('socketio').setLevel(logging.WARNING)
 logging.getLogger('engineio').setLevel(logging.WARNING)
 logging.getLogger('socketio.server').setLevel(logging.WARNING) 
 logging.getLogger('engineio.server').setLevel(logging.WARNING)
+# ------------------------------------------------------------------------------
+# JSON -- orjson for request bodies, jsonify and Socket.IO packets
+# ------------------------------------------------------------------------------
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (request.get_json, jsonify)."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+class ORJSONSocketIO:
+    """orjson in the json-module shape python-socketio packets expect."""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # Packets ask for compact separators, which is all orjson produces
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
 # ------------------------------------------------------------------------------
 # Flask -- templates & static live under pitext_travel/
 # ------------------------------------------------------------------------------
@@ -47,6 +75,8 @@ app = Flask(
     static_folder=str(BASE_DIR / "pitext_travel" / "static"),
 )
 
+app.json = ORJSONProvider(app)
+
 app.secret_key = os.getenv("FLASK_SECRET_KEY", os.urandom(32).hex())
 if "FLASK_SECRET_KEY" not in os.environ:
     logger.warning("No FLASK_SECRET_KEY found. Generated a temporary key.")
@@ -58,21 +88,35 @@ app.config.update(
     PERMANENT_SESSION_LIFETIME=86400,
 )
 
+if not DEBUG:
+    # Static assets aren't fingerprinted, so keep browser caching modest
+    app.config.update(
+        TEMPLATES_AUTO_RELOAD=False,
+        SEND_FILE_MAX_AGE_DEFAULT=int(os.getenv("STATIC_MAX_AGE_SECONDS", "3600")),
+    )
+
 # CORS for local dev / front-end requests
 CORS(app, origins="*", supports_credentials=True)
 
 # ------------------------------------------------------------------------------
 # Socket.IO
 # ------------------------------------------------------------------------------
+from pitext_travel.api.config import get_websocket_config
+
+WEBSOCKET_CONFIG = get_websocket_config()
+
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
     async_mode="eventlet",
-    logger=True,
-    engineio_logger=True,
+    # Per-packet Socket.IO/Engine.IO logging only in development
+    logger=DEBUG,
+    engineio_logger=DEBUG,
     path="socket.io",
-    ping_timeout=60,
-    ping_interval=25
+    json=ORJSONSocketIO,
+    ping_timeout=WEBSOCKET_CONFIG["ping_timeout"],
+    ping_interval=WEBSOCKET_CONFIG["ping_interval"],
+    max_http_buffer_size=WEBSOCKET_CONFIG["max_message_size"],
 )
 logger.info("Socket.IO initialised (async_mode=eventlet)")
 
@@ -161,13 +205,11 @@ def _disconnect():
 if __name__ == "__main__":
     host  = os.getenv("HOST", "0.0.0.0")
     port  = int(os.getenv("PORT", 5000))
-    is_debug = os.getenv("FLASK_ENV") == "development"
-
     logger.info("Starting travel app on %s:%s", host, port)
-    logger.info("Debug mode: %s", is_debug)
+    logger.info("Debug mode: %s", DEBUG)
     logger.info("Blueprint loaded: %s", blueprint_loaded)
 
-    socketio.run(app, host=host, port=port, debug=is_debug, allow_unsafe_werkzeug=True)
+    socketio.run(app, host=host, port=port, debug=DEBUG, allow_unsafe_werkzeug=True)
 
 # For ASGI servers
 __all__ = ["app", "socketio"]
@@ -1,11 +1,15 @@
 # api/config.py
 """Configuration management for the travel planner API."""
+import logging
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from openai.types.beta.realtime.session import TurnDetection
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def get_openai_api_key():
     """Get OpenAI API key from environment."""
@@ -34,19 +38,20 @@ def get_render_mode():
     return os.getenv("RENDER_MODE", "html")
 
 # NEW: Realtime API Configuration
+@lru_cache(maxsize=1)
 def get_realtime_config():
-    """Get OpenAI Realtime API configuration."""
+    """Get OpenAI Realtime API configuration.
+    
+    Built once per process (every RealtimeClient asks for it); treat the
+    returned dict as read-only.
+    """
     vad_silence_ms = int(os.getenv("REALTIME_VAD_SILENCE_MS", 1500))  # Reduced to 1.5 seconds
     vad_threshold = float(os.getenv("REALTIME_VAD_THRESHOLD", 0.5))
     
-    # --- BEGIN DEBUG LOGGING ---
-    print("="*60)
-    print("🔧 VAD CONFIGURATION LOADED 🔧")
-    print(f"   - Environment Variable: REALTIME_VAD_SILENCE_MS={os.getenv('REALTIME_VAD_SILENCE_MS', 'NOT_SET')}")
-    print(f"   - Silence Duration (ms): {vad_silence_ms}")
-    print(f"   - Threshold:             {vad_threshold}")
-    print("="*60)
-    # --- END DEBUG LOGGING ---
+    logger.info(
+        "🔧 VAD configuration loaded: REALTIME_VAD_SILENCE_MS=%s, silence %d ms, threshold %s",
+        os.getenv("REALTIME_VAD_SILENCE_MS", "NOT_SET"), vad_silence_ms, vad_threshold,
+    )
 
     turn_cfg = TurnDetection(
         type="server_vad",
@@ -75,13 +80,23 @@ def get_realtime_config():
         "session_timeout_seconds": int(os.getenv("REALTIME_SESSION_TIMEOUT_SECONDS", "600")),
         "max_concurrent_sessions": int(os.getenv("MAX_CONCURRENT_REALTIME_SESSIONS", "50")),
         "rate_limit_per_ip": int(os.getenv("REALTIME_RATE_LIMIT_PER_IP", "10")),
+        # Comma-separated proxy IPs/CIDRs whose X-Forwarded-For is honoured
+        "trusted_proxies": [
+            cidr.strip() for cidr in os.getenv("TRUSTED_PROXIES", "").split(",") if cidr.strip()
+        ],
         "turn_detection": turn_cfg,  # Fixed: use local turn_cfg, not global
         
         # Audio configuration
         "audio_format": {
             "input": os.getenv("AUDIO_INPUT_FORMAT", "pcm16"),
             "output": os.getenv("AUDIO_OUTPUT_FORMAT", "pcm16"),
-            "sample_rate": int(os.getenv("AUDIO_SAMPLE_RATE", "24000"))
+            "sample_rate": int(os.getenv("AUDIO_SAMPLE_RATE", "24000")),
+            # Send TTS audio to the browser as binary attachments;
+            # AUDIO_BINARY=0 falls back to base64 strings
+            "binary": os.getenv("AUDIO_BINARY", "1") == "1",
+            # TTS chunks arriving within this window go out as one audio_chunk;
+            # wider windows mean fewer frames but later first audio
+            "coalesce_ms": int(os.getenv("AUDIO_COALESCE_MS", "15")),
         },
         
         # Instructions for the assistant
@@ -135,6 +150,8 @@ def validate_realtime_config():
     valid_formats = ["pcm16", "g711_ulaw", "g711_alaw"]
     if realtime_config["audio_format"]["input"] not in valid_formats:
         raise ValueError(f"Invalid input audio format. Must be one of: {', '.join(valid_formats)}")
+    if realtime_config["audio_format"]["output"] not in valid_formats:
+        raise ValueError(f"Invalid output audio format. Must be one of: {', '.join(valid_formats)}")
     
     return True
 
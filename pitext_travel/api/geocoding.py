@@ -2,19 +2,36 @@
 from __future__ import annotations
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 import time
 from functools import lru_cache
 
 # ─── existing imports ───────────────────────────────────────────────────────────
 import googlemaps
+import requests
+from requests.adapters import HTTPAdapter
 from pitext_travel.api.config import get_google_maps_config
 # from pitext_travel.api.models import DayPlan, Stop   # optional – only if you use dataclasses
 
 logger = logging.getLogger(__name__)
 
 _gmaps: googlemaps.Client | None = None
-_geocoding_cache: Dict[str, tuple[float, float]] = {}
+
+# Geocoding is pure network wait; overlap the round-trips of a batch
+_geocode_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="geocode")
+
+# Caps in-flight Geocoding API requests process-wide, including direct
+# get_coordinates_for_place callers outside the batch pool
+_MAX_INFLIGHT_GEOCODES = 8
+_geocode_slots = threading.BoundedSemaphore(_MAX_INFLIGHT_GEOCODES)
+
+def _build_http_session() -> requests.Session:
+    """Keep-alive HTTP session sized for the in-flight geocode cap."""
+    http = requests.Session()
+    http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=_MAX_INFLIGHT_GEOCODES))
+    return http
 
 def _get_client() -> googlemaps.Client:
     """Return a cached googlemaps.Client instance."""
@@ -27,7 +44,7 @@ def _get_client() -> googlemaps.Client:
                 logger.error("No Google Maps API key found in config")
                 return None
             logger.info(f"Initializing Google Maps client with key: {api_key[:10]}...")
-            _gmaps = googlemaps.Client(key=api_key)
+            _gmaps = googlemaps.Client(key=api_key, requests_session=_build_http_session())
         except Exception as e:
             logger.error(f"Failed to initialize Google Maps client: {e}")
             return None
@@ -46,7 +63,8 @@ def get_coordinates_for_place(place: str) -> tuple[float, float] | None:
             return None
             
         logger.debug(f"Geocoding place: {place}")
-        results = client.geocode(place, language="en")
+        with _geocode_slots:
+            results = client.geocode(place, language="en")
         
         if not results:
             logger.warning(f"No results found for place: {place}")
@@ -59,9 +77,28 @@ def get_coordinates_for_place(place: str) -> tuple[float, float] | None:
         logger.error(f"Geocoding error for '{place}': {e}")
         return None
 
+@lru_cache(maxsize=10_000)
+def _geocode_normalized(place: str, city: str) -> tuple[float, float] | None:
+    """Geocode an already-normalised (place, city) pair."""
+    # Add city context for better results
+    query = f"{place}, {city}" if city else place
+    return get_coordinates_for_place(query)
+
+
+def geocode_place(place: str, city: str = "") -> tuple[float, float] | None:
+    """Resolve a place within an optional city to (lat, lng) or None.
+    
+    Results are cached by case-insensitive (place, city), so the same
+    landmark requested by different itineraries is only looked up once.
+    """
+    return _geocode_normalized(place.strip().lower(), city.strip().lower())
+
+
 def batch_geocode_places(places: List[str], city: str = "") -> Dict[str, tuple[float, float]]:
     """Geocode multiple places efficiently with caching and batching.
     
+    Cache misses are resolved concurrently on a small thread pool.
+    
     Args:
         places: List of place names to geocode
         city: Optional city context for better results
@@ -70,25 +107,18 @@ def batch_geocode_places(places: List[str], city: str = "") -> Dict[str, tuple[f
         Dictionary mapping place names to (lat, lng) coordinates
     """
     results = {}
-    start_time = time.time()
+    start_time = time.perf_counter()
     
-    for place in places:
-        # Check cache first
-        if place in _geocoding_cache:
-            results[place] = _geocoding_cache[place]
-            continue
-            
-        # Add city context for better results
-        query = f"{place}, {city}" if city else place
-        
-        coords = get_coordinates_for_place(query)
+    unique_places = list(dict.fromkeys(places))
+    all_coords = _geocode_pool.map(lambda place: geocode_place(place, city), unique_places)
+    
+    for place, coords in zip(unique_places, all_coords):
         if coords:
             results[place] = coords
-            _geocoding_cache[place] = coords  # Cache the result
         else:
             logger.warning(f"Failed to geocode '{place}'")
     
-    duration = time.time() - start_time
+    duration = time.perf_counter() - start_time
     logger.info(f"Batch geocoded {len(places)} places in {duration:.2f}s")
     
     return results
@@ -172,6 +202,7 @@ def enhance_itinerary_with_geocoding(itinerary: List[Dict[str, Any]]) -> List[Di
 # Re-export for clean imports elsewhere
 __all__ = [
     "get_coordinates_for_place",
+    "geocode_place",
     "enhance_itinerary_with_geocoding",
     "batch_geocode_places",
 ]
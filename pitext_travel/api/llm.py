@@ -11,8 +11,11 @@ from __future__ import annotations
 import json
 import logging
 import os
-from typing import Any, Dict, List
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
 
+import orjson
 from openai import OpenAI
 
 client = OpenAI()                         # picks up OPENAI_API_KEY automatically
@@ -83,3 +86,36 @@ def generate_trip_itinerary(city: str, days: int) -> List[Dict[str, Any]]:
     itinerary = _parse_response(raw_content)
 
     return enhance_itinerary_with_geocoding(itinerary)
+
+
+# Serialised itineraries keyed by (normalised city, days)
+_ITINERARY_CACHE_SIZE = 256
+_itinerary_cache: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+_itinerary_cache_lock = threading.Lock()
+
+
+def cached_trip_itinerary(city: str, days: int) -> List[Dict[str, Any]]:
+    """Memoised generate_trip_itinerary keyed on (normalised city, days).
+
+    Repeat requests for the same trip skip the LLM and geocoding round
+    trips.  Only the cache key is lower-cased; a miss generates with the
+    caller's spelling.  The cache holds the serialised result, so every
+    caller gets its own copy to mutate; failures are not cached.
+    """
+    city = city.strip()
+    days = int(days)
+    key = (city.lower(), days)
+    with _itinerary_cache_lock:
+        payload = _itinerary_cache.get(key)
+        if payload is not None:
+            _itinerary_cache.move_to_end(key)
+            return orjson.loads(payload)
+
+    payload = orjson.dumps(generate_trip_itinerary(city, days))
+
+    with _itinerary_cache_lock:
+        _itinerary_cache[key] = payload
+        if len(_itinerary_cache) > _ITINERARY_CACHE_SIZE:
+            _itinerary_cache.popitem(last=False)
+
+    return orjson.loads(payload)
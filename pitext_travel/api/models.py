@@ -8,7 +8,7 @@ single source‑of‑truth definition for itinerary objects.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -31,6 +31,15 @@ class Stop:
         }
 
 
+@dataclass(slots=True)
+class CurrentItinerary:
+    """The itinerary a voice session is currently discussing."""
+
+    data: Dict[str, Any]  # {"days": [...], "metadata": {...}}
+    city: str
+    days: int
+
+
 # A trip itinerary is represented as a list of lists (one list per day)
 # where each inner list contains Stop objects for that day.
 Itinerary = list[list[Stop]]
@@ -12,6 +12,56 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# pybase64 runs SIMD kernels; stdlib base64 is the fallback when it's missing
+try:
+    import pybase64
+
+    def b64encode_audio(data: bytes) -> str:
+        """Base64-encode PCM bytes straight to an ASCII str."""
+        return pybase64.b64encode_as_string(data)
+
+    def b64decode_audio(data) -> bytes:
+        """Decode base64 audio (str or bytes) without strict validation."""
+        return pybase64.b64decode(data, validate=False)
+
+except ImportError:
+    import base64
+
+    def b64encode_audio(data: bytes) -> str:
+        """Base64-encode PCM bytes straight to an ASCII str."""
+        return base64.b64encode(data).decode("ascii")
+
+    def b64decode_audio(data) -> bytes:
+        """Decode base64 audio (str or bytes) without strict validation."""
+        return base64.b64decode(data)
+
+
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+def _drain(buffer: deque, max_bytes: Optional[int]) -> bytes:
+    """Pop up to max_bytes (all if None) of queued audio; caller holds the lock."""
+    if max_bytes is None:
+        # Return all buffered audio
+        data = b"".join(buffer)
+        buffer.clear()
+        return data
+    
+    # Accumulate in a bytearray; repeated bytes += copied the prefix each time
+    collected = bytearray()
+    while buffer and len(collected) < max_bytes:
+        chunk = buffer.popleft()
+        take = max_bytes - len(collected)
+        if len(chunk) <= take:
+            collected += chunk
+        else:
+            # Split chunk
+            collected += chunk[:take]
+            buffer.appendleft(chunk[take:])
+            break
+    
+    return bytes(collected)
+
 
 class AudioHandler:
     """Handles audio format conversion and buffering for Realtime API."""
@@ -57,27 +107,7 @@ class AudioHandler:
             if not self.input_buffer:
                 return b""
             
-            if max_bytes is None:
-                # Return all buffered audio
-                data = b"".join(self.input_buffer)
-                self.input_buffer.clear()
-                return data
-            else:
-                # Return up to max_bytes
-                collected = b""
-                while self.input_buffer and len(collected) < max_bytes:
-                    chunk = self.input_buffer.popleft()
-                    
-                    if len(collected) + len(chunk) <= max_bytes:
-                        collected += chunk
-                    else:
-                        # Split chunk
-                        take = max_bytes - len(collected)
-                        collected += chunk[:take]
-                        self.input_buffer.appendleft(chunk[take:])
-                        break
-                
-                return collected
+            return _drain(self.input_buffer, max_bytes)
     
     def clear_input_buffer(self):
         """Clear the input audio buffer."""
@@ -106,27 +136,7 @@ class AudioHandler:
             if not self.output_buffer:
                 return b""
             
-            if max_bytes is None:
-                # Return all buffered audio
-                data = b"".join(self.output_buffer)
-                self.output_buffer.clear()
-                return data
-            else:
-                # Return up to max_bytes
-                collected = b""
-                while self.output_buffer and len(collected) < max_bytes:
-                    chunk = self.output_buffer.popleft()
-                    
-                    if len(collected) + len(chunk) <= max_bytes:
-                        collected += chunk
-                    else:
-                        # Split chunk
-                        take = max_bytes - len(collected)
-                        collected += chunk[:take]
-                        self.output_buffer.appendleft(chunk[take:])
-                        break
-                
-                return collected
+            return _drain(self.output_buffer, max_bytes)
     
     def clear_output_buffer(self):
         """Clear the output audio buffer."""
@@ -167,7 +177,7 @@ class AudioHandler:
             return resampled.tobytes()
             
         except Exception as e:
-            logger.error(f"Failed to resample audio: {e}")
+            logger.error("Failed to resample audio: %s", e)
             return audio_data
     
     def create_wav_header(self, data_size: int) -> bytes:
@@ -179,22 +189,22 @@ class AudioHandler:
         Returns:
             WAV header bytes
         """
-        # WAV header structure
-        header = b"RIFF"
-        header += struct.pack("<I", data_size + 36)  # File size - 8
-        header += b"WAVE"
-        header += b"fmt "
-        header += struct.pack("<I", 16)  # Subchunk size
-        header += struct.pack("<H", 1)   # Audio format (1 = PCM)
-        header += struct.pack("<H", self.channels)
-        header += struct.pack("<I", self.sample_rate)
-        header += struct.pack("<I", self.sample_rate * self.channels * self.bytes_per_sample)
-        header += struct.pack("<H", self.channels * self.bytes_per_sample)
-        header += struct.pack("<H", self.bytes_per_sample * 8)
-        header += b"data"
-        header += struct.pack("<I", data_size)
-        
-        return header
+        # WAV header structure, packed in one call
+        return _WAV_HEADER.pack(
+            b"RIFF",
+            data_size + 36,  # File size - 8
+            b"WAVE",
+            b"fmt ",
+            16,  # Subchunk size
+            1,   # Audio format (1 = PCM)
+            self.channels,
+            self.sample_rate,
+            self.sample_rate * self.channels * self.bytes_per_sample,
+            self.channels * self.bytes_per_sample,
+            self.bytes_per_sample * 8,
+            b"data",
+            data_size,
+        )
     
     def pcm_to_wav(self, pcm_data: bytes) -> bytes:
         """Convert PCM16 audio to WAV format.
@@ -230,7 +240,7 @@ class AudioHandler:
             return wav_data
             
         except Exception as e:
-            logger.error(f"Failed to extract PCM from WAV: {e}")
+            logger.error("Failed to extract PCM from WAV: %s", e)
             return wav_data
     
     def get_buffer_duration(self, buffer_size: int) -> float:
@@ -2,21 +2,32 @@
 
 from __future__ import annotations
 
-import base64
-import json
 import logging
 import ssl
 import threading
-from queue import Queue
+from queue import Empty, Full, Queue
 from typing import Any, Callable, Dict, Optional
 
+import orjson
 import websocket
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from pitext_travel.api.config import get_openai_api_key, get_realtime_config
+from pitext_travel.api.realtime.audio_handler import b64decode_audio, b64encode_audio
 
 logger = logging.getLogger(__name__)
 
+# Constant control events, serialized once at import time.
+_COMMIT = {"type": "input_audio_buffer.commit"}
+_RESPONSE_CREATE = {"type": "response.create"}
+_CLEAR = {"type": "input_audio_buffer.clear"}
+_CANCEL = {"type": "response.cancel"}
+
+_COMMIT_JSON = orjson.dumps(_COMMIT)
+_RESPONSE_CREATE_JSON = orjson.dumps(_RESPONSE_CREATE)
+_CLEAR_JSON = orjson.dumps(_CLEAR)
+_CANCEL_JSON = orjson.dumps(_CANCEL)
+
 
 class RealtimeClient:
     """Thin wrapper around the OpenAI Realtime WebSocket API.
@@ -41,6 +52,14 @@ class RealtimeClient:
         self.outgoing_queue: Queue = Queue()
         self.incoming_queue: Queue = Queue()
 
+        # Audio waiting for on_audio_chunk; bounded so a slow consumer
+        # drops stale audio instead of stalling the receive loop.
+        self._audio_out_queue: Queue = Queue(maxsize=64)
+        self._audio_thread: Optional[threading.Thread] = None
+        # Hand on_audio_chunk the base64 delta as received instead of PCM
+        # bytes, for consumers that forward base64 anyway
+        self.audio_as_b64: bool = False
+
         # Callback hooks
         self.on_transcript: Optional[Callable] = None
         self.on_audio_chunk: Optional[Callable] = None
@@ -65,7 +84,7 @@ class RealtimeClient:
             if self.is_connected:
                 return True
 
-            logger.info(f"🚀 Starting OpenAI Realtime API connection for session {self.session_id}")
+            logger.info("🚀 Starting OpenAI Realtime API connection for session %s", self.session_id)
             
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -94,17 +113,25 @@ class RealtimeClient:
                 daemon=True,
             )
             self._thread.start()
-            logger.info(f"📡 WebSocket thread started for session {self.session_id}")
+            logger.info("📡 WebSocket thread started for session %s", self.session_id)
+
+            if self._audio_thread is None or not self._audio_thread.is_alive():
+                self._audio_thread = threading.Thread(
+                    target=self._audio_pump,
+                    name=f"realtime-audio-{self.session_id}",
+                    daemon=True,
+                )
+                self._audio_thread.start()
 
             # Wait for connection - increased timeout for better reliability
             timeout = 30  # Increased from 20 to 30 seconds for better reliability
-            logger.info(f"⏱️ Waiting up to {timeout} seconds for OpenAI connection...")
+            logger.info("⏱️ Waiting up to %s seconds for OpenAI connection...", timeout)
             
             while timeout > 0 and not self.is_connected:
                 threading.Event().wait(0.1)
                 timeout -= 1
                 if timeout % 10 == 0:  # Log every 10 seconds
-                    logger.info(f"⏱️ Still waiting for OpenAI connection... {timeout}s remaining")
+                    logger.info("⏱️ Still waiting for OpenAI connection... %ss remaining", timeout)
 
             if not self.is_connected:
                 logger.error("Realtime API: connection timed out after 30 seconds")
@@ -137,16 +164,52 @@ class RealtimeClient:
                 self._thread.join(timeout=2.0)
                 self._thread = None
 
-    def _send_event(self, event: Dict[str, Any]):
-        """Serialize event to JSON and push through the socket."""
+            if self._audio_thread and self._audio_thread.is_alive():
+                self._enqueue_audio(None)
+                self._audio_thread.join(timeout=2.0)
+            self._audio_thread = None
+
+    def _enqueue_audio(self, item):
+        """Queue an audio item, dropping the oldest one when full."""
+        while True:
+            try:
+                self._audio_out_queue.put_nowait(item)
+                return
+            except Full:
+                try:
+                    self._audio_out_queue.get_nowait()
+                except Empty:
+                    pass
+
+    def _audio_pump(self):
+        """Deliver queued audio to on_audio_chunk off the receive thread."""
+        while True:
+            item = self._audio_out_queue.get()
+            if item is None:
+                return
+            if self.on_audio_chunk:
+                try:
+                    self.on_audio_chunk(*item)
+                except Exception:
+                    logger.exception("on_audio_chunk callback failed")
+
+    def _send_event(self, event: Dict[str, Any], payload: Optional[bytes] = None):
+        """Serialize event to JSON and push through the socket.
+
+        ``payload`` may carry a pre-serialized form of ``event``.
+        """
         if not self.is_connected or not self._ws_app:
             logger.warning("Tried to send while not connected: %s", event.get("type"))
             return
         try:
-            payload = json.dumps(event)
+            if payload is None:
+                # UTF-8 bytes go out as a text frame without re-encoding
+                payload = orjson.dumps(event)
             self._ws_app.send(payload)
             self.outgoing_queue.put(event)
-            logger.debug("▶ %s", event["type"])
+            # Runs for every audio append; skip the call when debug is off
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("▶ %s", event["type"])
         except Exception as exc:
             logger.error("Failed to send %s: %s", event.get("type"), exc)
             if self.on_error:
@@ -157,10 +220,13 @@ class RealtimeClient:
         logger.info("Realtime API connection established for session %s", self.session_id)
         self.is_connected = True
 
-        # Create session with server-side VAD
+        # Create session with server-side VAD. Formats come from config so
+        # G.711 clients (AUDIO_INPUT_FORMAT/AUDIO_OUTPUT_FORMAT=g711_ulaw) are
+        # handled by the Realtime API without transcoding here.
+        audio_format = self.config["audio_format"]
         self.update_session(
-            input_audio_format="pcm16",
-            output_audio_format="pcm16",
+            input_audio_format=audio_format["input"],
+            output_audio_format=audio_format["output"],
             instructions=self.config["instructions"],
             temperature=self.config["temperature"],
             turn_detection={
@@ -176,8 +242,8 @@ class RealtimeClient:
     def _on_message(self, ws, message):
         """Decode JSON and route to the appropriate handler."""
         try:
-            event = json.loads(message)
-        except json.JSONDecodeError:
+            event = orjson.loads(message)
+        except orjson.JSONDecodeError:
             logger.error("Malformed message: %s", message[:120])
             return
 
@@ -294,14 +360,15 @@ class RealtimeClient:
 
     def _handle_audio_delta(self, event):
         if self.on_audio_chunk:
-            audio_bytes = base64.b64decode(event.get("delta", ""))
-            self.on_audio_chunk(audio_bytes, event.get("item_id"))
+            delta = event.get("delta", "")
+            audio = delta if self.audio_as_b64 else b64decode_audio(delta)
+            self._enqueue_audio((audio, event.get("item_id")))
 
     def _handle_function_call(self, event):
         if self.on_function_call:
             try:
-                args = json.loads(event.get("arguments", "{}"))
-            except json.JSONDecodeError:
+                args = orjson.loads(event.get("arguments", "{}"))
+            except orjson.JSONDecodeError:
                 args = {}
             self.on_function_call(event.get("call_id"), event.get("name"), args)
 
@@ -316,19 +383,20 @@ class RealtimeClient:
         """Send audio data continuously (no VAD filtering)."""
         if not self.is_connected:
             return
-        self._send_event(
-            {
-                "type": "input_audio_buffer.append",
-                "audio": base64.b64encode(audio_data).decode("ascii"),
-            }
-        )
+        self.send_audio_b64(b64encode_audio(audio_data))
+
+    def send_audio_b64(self, audio_b64: str):
+        """Send PCM16 audio that is already base64-encoded, without re-encoding."""
+        if not self.is_connected:
+            return
+        self._send_event({"type": "input_audio_buffer.append", "audio": audio_b64})
 
     def commit_audio(self):
         """Note: With server-side VAD, OpenAI handles this automatically."""
-        self._send_event({"type": "input_audio_buffer.commit"})
+        self._send_event(_COMMIT, _COMMIT_JSON)
 
     def clear_audio_buffer(self):
-        self._send_event({"type": "input_audio_buffer.clear"})
+        self._send_event(_CLEAR, _CLEAR_JSON)
 
     def send_text(self, text: str):
         self._send_event(
@@ -341,12 +409,12 @@ class RealtimeClient:
                 },
             }
         )
-        self._send_event({"type": "response.create"})
+        self._send_event(_RESPONSE_CREATE, _RESPONSE_CREATE_JSON)
 
     def interrupt(self):
         """Cancel the current response."""
         if self.is_model_speaking:
-            self._send_event({"type": "response.cancel"})
+            self._send_event(_CANCEL, _CANCEL_JSON)
 
     def update_session(
         self,
@@ -401,7 +469,7 @@ class RealtimeClient:
                 "item": {
                     "type": "function_call_output",
                     "call_id": call_id,
-                    "output": json.dumps(result) if not isinstance(result, str) else result,
+                    "output": orjson.dumps(result).decode() if not isinstance(result, str) else result,
                 },
             }
         )
\ No newline at end of file
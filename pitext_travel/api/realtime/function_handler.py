@@ -3,13 +3,75 @@
 
 import json
 import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, Optional, Callable
 from flask import session
 
 from pitext_travel.api.llm import generate_trip_itinerary
+from pitext_travel.api.services.itinerary_service import ItineraryService
 
 logger = logging.getLogger(__name__)
 
+# One bounded pool shared by every session. A pool per handler would cost a
+# thread stack per voice session even though function calls are rare.
+_SHARED_EXEC = ThreadPoolExecutor(
+    max_workers=min(8, (os.cpu_count() or 2) * 2),
+    thread_name_prefix="itinerary-shared",
+)
+
+# Function definitions for the Realtime API. They never vary per session,
+# so they and the tool list built from them are module constants.
+_FUNCTION_DEFINITIONS = [
+    {
+        "type": "function",
+        "name": "plan_trip",
+        "description": "Plan a multi-day itinerary for a city. Use this when the user provides BOTH a city name AND number of days.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "city": {
+                    "type": "string",
+                    "description": "The city name for the trip"
+                },
+                "days": {
+                    "type": "integer",
+                    "description": "Number of days for the trip",
+                    "minimum": 1,
+                    "maximum": 14
+                }
+            },
+            "required": ["city", "days"]
+        }
+    },
+    {
+        "type": "function",
+        "name": "explain_day",
+        "description": "Explain the itinerary for a specific day or provide an overview of all days",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "day_number": {
+                    "type": "integer",
+                    "description": "The day number to explain (1-based), or 0 for overview",
+                    "minimum": 0
+                }
+            },
+            "required": ["day_number"]
+        }
+    }
+]
+
+_TOOLS = [
+    {
+        "type": "function",
+        "name": d["name"],
+        "description": d.get("description", ""),
+        "parameters": d.get("parameters", {}),
+    }
+    for d in _FUNCTION_DEFINITIONS
+]
+
 
 class FunctionHandler:
     """Handles function calls from the Realtime API."""
@@ -28,46 +90,7 @@ class FunctionHandler:
             "explain_day": self._handle_explain_day
         }
         
-    # Function definitions for Realtime API
-        self.function_definitions = [
-            {
-                "type": "function",
-                "name": "plan_trip",
-                "description": "Plan a multi-day itinerary for a city. Use this when the user provides BOTH a city name AND number of days.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "city": {
-                            "type": "string",
-                            "description": "The city name for the trip"
-                        },
-                        "days": {
-                            "type": "integer", 
-                            "description": "Number of days for the trip",
-                            "minimum": 1, 
-                            "maximum": 14
-                        }
-                    },
-                    "required": ["city", "days"]
-                }
-            },
-            {
-                "type": "function",
-                "name": "explain_day",
-                "description": "Explain the itinerary for a specific day or provide an overview of all days",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "day_number": {
-                            "type": "integer",
-                            "description": "The day number to explain (1-based), or 0 for overview",
-                            "minimum": 0
-                        }
-                    },
-                    "required": ["day_number"]
-                }
-            }
-        ]    
+        self.function_definitions = _FUNCTION_DEFINITIONS
         
     def handle_function_call(self, call_id: str, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Handle a function call from the Realtime API.
@@ -80,7 +103,7 @@ class FunctionHandler:
         Returns:
             Function result to send back to Realtime API
         """
-        logger.info(f"Handling function call: {name} with args {arguments}")
+        logger.info("Handling function call: %s with args %s", name, arguments)
         
         try:
             if name not in self.functions:
@@ -99,7 +122,7 @@ class FunctionHandler:
             return result
             
         except Exception as e:
-            logger.error(f"Error executing function {name}: {e}")
+            logger.error("Error executing function %s: %s", name, e)
             return {
                 "error": str(e),
                 "success": False,
@@ -107,6 +130,19 @@ class FunctionHandler:
                 "function": name
             }
     
+    def submit_function_call(self, call_id: str, name: str, arguments: Dict[str, Any]) -> Future:
+        """Run handle_function_call on the shared worker pool.
+        
+        Args:
+            call_id: Unique ID for this function call
+            name: Function name
+            arguments: Function arguments
+            
+        Returns:
+            Future resolving to the function result
+        """
+        return _SHARED_EXEC.submit(self.handle_function_call, call_id, name, arguments)
+    
     def _handle_plan_trip(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Handle the plan_trip function call.
         
@@ -114,7 +150,9 @@ class FunctionHandler:
             args: Function arguments (city, days)
             
         Returns:
-            Result with itinerary data
+            Compact result for the Realtime API, plus the full itinerary
+            under ``_itinerary`` for the map; callers must pop it before
+            sending the result back
         """
         city = args.get("city")
         days = args.get("days")
@@ -136,17 +174,22 @@ class FunctionHandler:
                     'days': days
                 }
             }
+            # Lets explain_day reuse cached explanations for this itinerary
+            itinerary['metadata']['hash'] = ItineraryService.itinerary_hash(itinerary)
             
-            # The voice response is now handled by the frontend to avoid duplication
+            # Only the spoken summary goes back to the model; the map gets
+            # the full itinerary out of band with this call's own result, so
+            # concurrent calls on the shared pool can't swap itineraries.
             return {
                 "success": True,
-                "itinerary": itinerary,
+                "voice_response": ItineraryService.format_voice_response(itinerary, city, days),
                 "city": city,
                 "days": days,
-                "action": "render_map"
+                "action": "render_map",
+                "_itinerary": itinerary
             }
         except Exception as e:
-            logger.error(f"Failed to generate itinerary: {e}")
+            logger.error("Failed to generate itinerary: %s", e)
             return {
                 "success": False,
                 "error": f"Failed to generate itinerary: {str(e)}",
@@ -189,16 +232,9 @@ class FunctionHandler:
         -------
         list
             List of tool objects ready to drop into `session.tools`.
+            Shared by all handlers; do not mutate.
         """
-        return [
-            {
-                "type": "function",
-                "name": d["name"],
-                "description": d.get("description", ""),
-                "parameters": d.get("parameters", {}),
-            }
-            for d in self.function_definitions
-        ]
+        return _TOOLS
     
     def format_explain_day_response(self, itinerary: Dict[str, Any], 
                                   city: str, day_number: int) -> str:
@@ -212,40 +248,7 @@ class FunctionHandler:
         Returns:
             Formatted voice response
         """
-        if not itinerary or 'days' not in itinerary:
-            return "I don't have a current itinerary to explain. Would you like me to plan a trip first?"
-        
-        days = itinerary['days']
-        
-        if day_number == 0:
-            # Overview
-            response = f"Here's your complete {len(days)}-day itinerary for {city}: "
-            
-            for i, day in enumerate(days):
-                stops = [stop['name'] for stop in day['stops']]
-                response += f"Day {i + 1}: You'll visit {', '.join(stops)}. "
-            
-            response += "Which day would you like me to explain in more detail?"
-            
-        else:
-            # Specific day
-            if 0 < day_number <= len(days):
-                day = days[day_number - 1]
-                response = f"On day {day_number} in {city}, here's your plan: "
-                
-                for j, stop in enumerate(day['stops'], 1):
-                    response += f"Stop {j}: {stop['name']}"
-                    if 'placeType' in stop and stop['placeType']:
-                        place_type = stop['placeType'].replace('_', ' ')
-                        response += f", which is a {place_type}"
-                    response += ". "
-                
-                response += f"That's {len(day['stops'])} amazing places to explore!"
-                
-            else:
-                response = f"I don't have information for day {day_number}. Your trip is {len(days)} days long."
-        
-        return response
+        return ItineraryService.format_day_explanation(itinerary, city, day_number)
 
 
 def create_function_handler(flask_session_id: str) -> FunctionHandler:
@@ -1,20 +1,33 @@
 # pitext_travel/api/realtime/session_manager.py
 """Session lifecycle management for Realtime API connections."""
 
+import ctypes
+import gc
 import time
+import heapq
 import threading
 import logging
-from typing import Dict, Optional, Any
-from collections import defaultdict
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime, timedelta
+from ipaddress import ip_address, ip_network
 import secrets
 
 from pitext_travel.api.config import get_realtime_config
+from pitext_travel.api.models import CurrentItinerary
 from pitext_travel.api.realtime.client import RealtimeClient
 from pitext_travel.api.realtime.audio_handler import AudioHandler
 
 logger = logging.getLogger(__name__)
 
+# glibc can hand freed heap pages back to the OS; absent on musl/macOS
+try:
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+except (OSError, AttributeError):
+    _malloc_trim = None
+
+# Counter attributes on RealtimeSession that update_session_stats buffers
+_STAT_FIELDS = ("audio_bytes_sent", "audio_bytes_received", "message_count", "function_calls")
+
 
 class RealtimeSession:
     """Represents a single Realtime API session."""
@@ -26,7 +39,8 @@ class RealtimeSession:
         
         # Timestamps
         self.created_at = datetime.now()
-        self.last_activity = datetime.now()
+        self.created_at_iso = self.created_at.isoformat(timespec="seconds")
+        self.last_activity: float = time.monotonic()  # Monotonic seconds
         self.connected_at: Optional[datetime] = None
         
         # Components
@@ -38,6 +52,7 @@ class RealtimeSession:
         # State
         self.is_active = False
         self.conversation_data = {}
+        self.itinerary: Optional[CurrentItinerary] = None  # Set by plan_trip
         self.function_results = {}
         
         # Stats
@@ -45,6 +60,39 @@ class RealtimeSession:
         self.audio_bytes_received = 0
         self.message_count = 0
         self.function_calls = 0
+        
+        # Increments buffered on the hot path, folded in by flush_stats().
+        # A per-session lock, so writers never contend on the manager lock.
+        self.pending_stats: Dict[str, int] = dict.fromkeys(_STAT_FIELDS, 0)
+        self.stats_lock = threading.Lock()
+    
+    def flush_stats(self):
+        """Fold buffered stat increments into the session counters."""
+        with self.stats_lock:
+            pending = self.pending_stats
+            self.pending_stats = dict.fromkeys(_STAT_FIELDS, 0)
+        for name, value in pending.items():
+            if value:
+                setattr(self, name, getattr(self, name) + value)
+    
+    def last_activity_iso(self) -> str:
+        """Wall-clock ISO timestamp of the last activity."""
+        idle = time.monotonic() - self.last_activity
+        return (datetime.now() - timedelta(seconds=idle)).isoformat(timespec="seconds")
+    
+    def stats_snapshot(self) -> Dict[str, Any]:
+        """Flush buffered stats and return the session's counters."""
+        self.flush_stats()
+        return {
+            "session_id": self.session_id,
+            "is_active": self.is_active,
+            "created_at": self.created_at_iso,
+            "last_activity": self.last_activity_iso(),
+            "audio_sent_kb": self.audio_bytes_sent / 1024,
+            "audio_received_kb": self.audio_bytes_received / 1024,
+            "message_count": self.message_count,
+            "function_calls": self.function_calls,
+        }
 
 
 class SessionManager:
@@ -52,12 +100,28 @@ class SessionManager:
     
     def __init__(self):
         self.config = get_realtime_config()
+        self._rate_limit: int = self.config["rate_limit_per_ip"]
+        self._max_sessions: int = self.config["max_concurrent_sessions"]
+        self._timeout: int = self.config["session_timeout_seconds"]
+        self.trusted_proxies = [
+            ip_network(cidr, strict=False) for cidr in self.config["trusted_proxies"]
+        ]
         self.sessions: Dict[str, RealtimeSession] = {}
-        self.ip_session_count = defaultdict(int)
+        # Session ids per Flask session, oldest first
+        self.flask_index: Dict[str, List[str]] = {}
+        # Ids of sessions currently connected to the Realtime API
+        self.active_ids: Set[str] = set()
+        # Per-IP window of {session_id: created (monotonic)}; counts are
+        # derived from live entries, so a missed release ages out
+        self.ip_sessions: Dict[str, Dict[str, float]] = {}
         
         # Thread safety
         self.lock = threading.Lock()
         
+        # Min-heap of (expiry, session_id); one entry per live session
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._wakeup = threading.Event()
+        
         # Start cleanup thread
         self.cleanup_thread = threading.Thread(
             target=self._cleanup_loop,
@@ -67,44 +131,118 @@ class SessionManager:
         
         logger.info("SessionManager initialized")
     
-    def create_session(self, user_ip: str, flask_session_id: str) -> Optional[RealtimeSession]:
+    def create_session(self, user_ip: str, flask_session_id: str,
+                       forwarded_for: Optional[str] = None) -> Optional[RealtimeSession]:
         """Create a new Realtime API session.
         
         Args:
-            user_ip: User's IP address for rate limiting
+            user_ip: Socket peer address of the request
             flask_session_id: Flask session ID for context sharing
+            forwarded_for: X-Forwarded-For header, if any
             
         Returns:
             RealtimeSession object or None if rate limited
         """
+        user_ip = self.resolve_client_ip(user_ip, forwarded_for)
+        
         with self.lock:
             # Check if there's already a session for this Flask session (active or not)
-            existing_session = self.get_session_by_flask_id(flask_session_id)
-            if existing_session:
-                logger.info(f"Reusing existing session {existing_session.session_id} for Flask session {flask_session_id}")
-                return existing_session
+            existing_session = self._latest_session_for_flask_id(flask_session_id)
             
-            # Check rate limit
-            if self.ip_session_count[user_ip] >= self.config["rate_limit_per_ip"]:
-                logger.warning(f"Rate limit exceeded for IP {user_ip}")
-                return None
+            # Global cap is a single compare; check it before the IP window
+            at_capacity = existing_session is None and len(self.active_ids) >= self._max_sessions
+            rate_limited = (existing_session is None and not at_capacity
+                            and self._ip_window_size(user_ip) >= self._rate_limit)
             
-            # Check global session limit
-            active_sessions = sum(1 for s in self.sessions.values() if s.is_active)
-            if active_sessions >= self.config["max_concurrent_sessions"]:
-                logger.warning("Maximum concurrent sessions reached")
-                return None
-            
-            # Generate unique session ID
-            session_id = f"rts_{secrets.token_urlsafe(16)}"
-            
-            # Create session
-            session = RealtimeSession(session_id, user_ip, flask_session_id)
-            self.sessions[session_id] = session
-            self.ip_session_count[user_ip] += 1
+            if existing_session is None and not at_capacity and not rate_limited:
+                # Generate unique session ID
+                session_id = f"rts_{secrets.token_urlsafe(12)}"
+                
+                # Create session
+                session = RealtimeSession(session_id, user_ip, flask_session_id)
+                self.sessions[session_id] = session
+                self.flask_index.setdefault(flask_session_id, []).append(session_id)
+                self.ip_sessions.setdefault(user_ip, {})[session_id] = session.last_activity
+                heapq.heappush(self._expiry_heap, (
+                    session.last_activity + self._timeout,
+                    session_id
+                ))
+        
+        # Log outside the critical section
+        if existing_session is not None:
+            logger.info("Reusing existing session %s for Flask session %s",
+                        existing_session.session_id, flask_session_id)
+            return existing_session
+        if at_capacity:
+            logger.warning("Maximum concurrent sessions reached")
+            return None
+        if rate_limited:
+            logger.warning("Rate limit exceeded for IP %s", user_ip)
+            return None
+        
+        # Let the cleanup thread pick up the new deadline
+        self._wakeup.set()
+        
+        logger.info("Created session %s for IP %s", session_id, user_ip)
+        return session
+    
+    def _is_trusted_proxy(self, addr: str) -> bool:
+        try:
+            ip = ip_address(addr)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+    
+    def resolve_client_ip(self, remote_addr: str, forwarded_for: Optional[str] = None) -> str:
+        """Resolve the real client IP used for per-IP limits.
+        
+        X-Forwarded-For is only honoured when the socket peer is a trusted
+        proxy; hops are read right to left, skipping trusted proxies, and
+        the first untrusted address wins.
+        
+        Args:
+            remote_addr: Socket peer address
+            forwarded_for: X-Forwarded-For header value
             
-            logger.info(f"Created session {session_id} for IP {user_ip}")
-            return session
+        Returns:
+            Client IP address
+        """
+        if not forwarded_for or not self._is_trusted_proxy(remote_addr):
+            return remote_addr
+        
+        client_ip = remote_addr
+        for hop in reversed(forwarded_for.split(",")):
+            hop = hop.strip()
+            try:
+                ip_address(hop)
+            except ValueError:
+                break  # Malformed hop; keep the last valid address
+            client_ip = hop
+            if not self._is_trusted_proxy(hop):
+                break
+        
+        return client_ip
+    
+    def _ip_window_size(self, user_ip: str) -> int:
+        """Live sessions counted against an IP; caller holds the lock.
+        
+        Entries whose session is gone, or idle past the session timeout,
+        are pruned first.
+        """
+        ip_window = self.ip_sessions.get(user_ip)
+        if not ip_window:
+            return 0
+        
+        cutoff = time.monotonic() - self._timeout
+        for session_id in list(ip_window):
+            session = self.sessions.get(session_id)
+            if session is None or session.last_activity < cutoff:
+                del ip_window[session_id]
+        
+        if not ip_window:
+            del self.ip_sessions[user_ip]
+            return 0
+        return len(ip_window)
     
     def get_session(self, session_id: str) -> Optional[RealtimeSession]:
         """Get an existing session by ID.
@@ -118,7 +256,7 @@ class SessionManager:
         with self.lock:
             session = self.sessions.get(session_id)
             if session:
-                session.last_activity = datetime.now()
+                session.last_activity = time.monotonic()
             return session
     
     def get_session_by_flask_id(self, flask_session_id: str) -> Optional[RealtimeSession]:
@@ -131,16 +269,16 @@ class SessionManager:
             Most recent RealtimeSession for this Flask session or None
         """
         with self.lock:
-            matching_sessions = [
-                s for s in self.sessions.values()
-                if s.flask_session_id == flask_session_id
-            ]
-            
-            if matching_sessions:
-                # Return most recent session (active or not)
-                return max(matching_sessions, key=lambda s: s.created_at)
-            
-            return None
+            return self._latest_session_for_flask_id(flask_session_id)
+    
+    def _latest_session_for_flask_id(self, flask_session_id: str) -> Optional[RealtimeSession]:
+        """Most recent session for a Flask session; caller holds the lock."""
+        session_ids = self.flask_index.get(flask_session_id)
+        if session_ids:
+            # Newest session is always appended last
+            return self.sessions[session_ids[-1]]
+        
+        return None
     
     def get_active_session_by_flask_id(self, flask_session_id: str) -> Optional[RealtimeSession]:
         """Get an active session by Flask session ID.
@@ -152,14 +290,10 @@ class SessionManager:
             Most recent active RealtimeSession for this Flask session or None
         """
         with self.lock:
-            matching_sessions = [
-                s for s in self.sessions.values()
-                if s.flask_session_id == flask_session_id and s.is_active
-            ]
-            
-            if matching_sessions:
-                # Return most recent active session
-                return max(matching_sessions, key=lambda s: s.created_at)
+            for session_id in reversed(self.flask_index.get(flask_session_id, ())):
+                session = self.sessions[session_id]
+                if session.is_active:
+                    return session
             
             return None
     
@@ -174,28 +308,30 @@ class SessionManager:
         """
         session = self.get_session(session_id)
         if not session:
-            logger.error(f"Session {session_id} not found for activation")
+            logger.error("Session %s not found for activation", session_id)
             return False
         
         try:
-            logger.info(f"🚀 Attempting to connect to OpenAI Realtime API for session {session_id}")
+            logger.info("🚀 Attempting to connect to OpenAI Realtime API for session %s", session_id)
             
             # Connect to Realtime API with timeout
-            start_time = time.time()
+            start_time = time.monotonic()
             if session.client.connect():
-                duration = time.time() - start_time
-                session.is_active = True
+                duration = time.monotonic() - start_time
+                with self.lock:
+                    session.is_active = True
+                    self.active_ids.add(session_id)
                 session.connected_at = datetime.now()
-                logger.info(f"✅ Successfully activated session {session_id} in {duration:.2f}s")
+                logger.info("✅ Successfully activated session %s in %.2fs", session_id, duration)
                 return True
             else:
-                duration = time.time() - start_time
-                logger.error(f"❌ Failed to connect session {session_id} after {duration:.2f}s")
+                duration = time.monotonic() - start_time
+                logger.error("❌ Failed to connect session %s after %.2fs", session_id, duration)
                 return False
                 
         except Exception as e:
-            duration = time.time() - start_time if 'start_time' in locals() else 0
-            logger.error(f"❌ Error activating session {session_id} after {duration:.2f}s: {e}")
+            duration = time.monotonic() - start_time if 'start_time' in locals() else 0
+            logger.error("❌ Error activating session %s after %.2fs: %s", session_id, duration, e)
             return False
     
     def deactivate_session(self, session_id: str, reason: str = "manual"):
@@ -210,28 +346,33 @@ class SessionManager:
             if not session:
                 return
             
-            # Disconnect client
-            if session.client:
-                session.client.disconnect()
-            
             # Update state
             session.is_active = False
+            self.active_ids.discard(session_id)
             
-            # Update IP count
-            if session.user_ip in self.ip_session_count:
-                self.ip_session_count[session.user_ip] = max(
-                    0, self.ip_session_count[session.user_ip] - 1
-                )
-            
-            # Log stats
-            duration = (datetime.now() - session.created_at).total_seconds()
-            logger.info(
-                f"Deactivated session {session_id} - "
-                f"Reason: {reason}, Duration: {duration:.1f}s, "
-                f"Messages: {session.message_count}, "
-                f"Audio sent: {session.audio_bytes_sent / 1024:.1f}KB, "
-                f"Audio received: {session.audio_bytes_received / 1024:.1f}KB"
-            )
+            # Release the IP slot
+            ip_window = self.ip_sessions.get(session.user_ip)
+            if ip_window is not None:
+                ip_window.pop(session_id, None)
+                if not ip_window:
+                    del self.ip_sessions[session.user_ip]
+        
+        # Disconnect outside the lock: closing the socket joins the client
+        # threads and must not stall bookkeeping for other sessions
+        if session.client:
+            session.client.disconnect()
+        
+        # Log stats
+        session.flush_stats()
+        duration = (datetime.now() - session.created_at).total_seconds()
+        logger.info(
+            "Deactivated session %s - Reason: %s, Duration: %.1fs, "
+            "Messages: %s, Audio sent: %.1fKB, Audio received: %.1fKB",
+            session_id, reason, duration,
+            session.message_count,
+            session.audio_bytes_sent / 1024,
+            session.audio_bytes_received / 1024,
+        )
     
     def remove_session(self, session_id: str):
         """Completely remove a session.
@@ -239,18 +380,35 @@ class SessionManager:
         Args:
             session_id: Session ID to remove
         """
+        session = self.sessions.get(session_id)
+        if session is None:
+            return
+        
+        # Ensure deactivated (takes the lock itself)
+        if session.is_active:
+            self.deactivate_session(session_id, "removal")
+        
+        # Remove from tracking
         with self.lock:
-            if session_id in self.sessions:
-                session = self.sessions[session_id]
-                
-                # Ensure deactivated
-                if session.is_active:
-                    self.deactivate_session(session_id, "removal")
-                
-                # Remove from tracking
-                del self.sessions[session_id]
-                
-                logger.info(f"Removed session {session_id}")
+            if self.sessions.pop(session_id, None) is None:
+                return
+            
+            session_ids = self.flask_index.get(session.flask_session_id)
+            if session_ids:
+                session_ids.remove(session_id)
+                if not session_ids:
+                    del self.flask_index[session.flask_session_id]
+        
+        # Drop large attachments now rather than whenever the last
+        # callback closure referencing the session is collected
+        session.audio_handler.clear_input_buffer()
+        session.audio_handler.clear_output_buffer()
+        session.conversation_data.clear()
+        session.itinerary = None
+        session.function_results.clear()
+        session.function_handler = None
+        
+        logger.info("Removed session %s", session_id)
     
     def update_session_stats(self, session_id: str, 
                            audio_sent: int = 0,
@@ -266,13 +424,17 @@ class SessionManager:
             messages: Number of messages
             functions: Number of function calls
         """
-        session = self.get_session(session_id)
+        # Hot path: skip the manager lock and only buffer the deltas under
+        # the session's own lock, so a concurrent flush can't drop them
+        session = self.sessions.get(session_id)
         if session:
-            session.audio_bytes_sent += audio_sent
-            session.audio_bytes_received += audio_received
-            session.message_count += messages
-            session.function_calls += functions
-            session.last_activity = datetime.now()
+            with session.stats_lock:
+                pending = session.pending_stats
+                pending["audio_bytes_sent"] += audio_sent
+                pending["audio_bytes_received"] += audio_received
+                pending["message_count"] += messages
+                pending["function_calls"] += functions
+            session.last_activity = time.monotonic()
     
     def get_active_sessions(self) -> Dict[str, Dict[str, Any]]:
         """Get information about all active sessions.
@@ -283,19 +445,22 @@ class SessionManager:
         with self.lock:
             active = {}
             
-            for sid, session in self.sessions.items():
-                if session.is_active:
-                    duration = (datetime.now() - session.created_at).total_seconds()
-                    active[sid] = {
-                        "user_ip": session.user_ip,
-                        "created_at": session.created_at.isoformat(),
-                        "duration_seconds": duration,
-                        "last_activity": session.last_activity.isoformat(),
-                        "messages": session.message_count,
-                        "function_calls": session.function_calls,
-                        "audio_sent_kb": session.audio_bytes_sent / 1024,
-                        "audio_received_kb": session.audio_bytes_received / 1024
-                    }
+            now = datetime.now()
+            
+            for sid in self.active_ids:
+                session = self.sessions[sid]
+                session.flush_stats()
+                duration = (now - session.created_at).total_seconds()
+                active[sid] = {
+                    "user_ip": session.user_ip,
+                    "created_at": session.created_at_iso,
+                    "duration_seconds": duration,
+                    "last_activity": session.last_activity_iso(),
+                    "messages": session.message_count,
+                    "function_calls": session.function_calls,
+                    "audio_sent_kb": session.audio_bytes_sent / 1024,
+                    "audio_received_kb": session.audio_bytes_received / 1024
+                }
             
             return active
     
@@ -307,9 +472,11 @@ class SessionManager:
         """
         with self.lock:
             total_sessions = len(self.sessions)
-            active_sessions = sum(1 for s in self.sessions.values() if s.is_active)
-            unique_ips = len(self.ip_session_count)
+            active_sessions = len(self.active_ids)
+            unique_ips = len(self.ip_sessions)
             
+            for s in self.sessions.values():
+                s.flush_stats()
             total_audio_sent = sum(s.audio_bytes_sent for s in self.sessions.values())
             total_audio_received = sum(s.audio_bytes_received for s in self.sessions.values())
             total_messages = sum(s.message_count for s in self.sessions.values())
@@ -324,31 +491,53 @@ class SessionManager:
                 "total_messages": total_messages,
                 "total_function_calls": total_functions,
                 "config": {
-                    "max_concurrent": self.config["max_concurrent_sessions"],
-                    "rate_limit_per_ip": self.config["rate_limit_per_ip"],
-                    "timeout_seconds": self.config["session_timeout_seconds"]
+                    "max_concurrent": self._max_sessions,
+                    "rate_limit_per_ip": self._rate_limit,
+                    "timeout_seconds": self._timeout
                 }
             }
     
     def _cleanup_loop(self):
-        """Background thread to clean up expired sessions."""
+        """Background thread to clean up expired sessions.
+        
+        Sleeps until the earliest session deadline instead of polling;
+        create_session wakes it when a new deadline is added.
+        """
         while True:
             try:
-                time.sleep(30)  # Check every 30 seconds
+                self._wakeup.wait(self._seconds_until_next_expiry())
+                self._wakeup.clear()
                 self._cleanup_expired_sessions()
             except Exception as e:
-                logger.error(f"Error in cleanup loop: {e}")
+                logger.error("Error in cleanup loop: %s", e)
+    
+    def _seconds_until_next_expiry(self) -> Optional[float]:
+        """Seconds until the earliest deadline, or None if there is none."""
+        with self.lock:
+            if not self._expiry_heap:
+                return None
+            next_expiry = self._expiry_heap[0][0]
+        return max(0.0, next_expiry - time.monotonic())
     
     def _cleanup_expired_sessions(self):
         """Remove sessions that have exceeded timeout."""
-        timeout_seconds = self.config["session_timeout_seconds"]
-        cutoff_time = datetime.now() - timedelta(seconds=timeout_seconds)
+        timeout = self._timeout
+        now = time.monotonic()
         
         expired_sessions = []
         
         with self.lock:
-            for sid, session in self.sessions.items():
-                if session.last_activity < cutoff_time:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, sid = heapq.heappop(self._expiry_heap)
+                session = self.sessions.get(sid)
+                if session is None:
+                    continue  # Already removed
+                
+                # Activity since the entry was pushed moves the deadline
+                expiry = session.last_activity + timeout
+                if expiry > now:
+                    heapq.heappush(self._expiry_heap, (expiry, sid))
+                else:
                     expired_sessions.append(sid)
         
         # Deactivate and remove expired sessions
@@ -357,7 +546,18 @@ class SessionManager:
             self.remove_session(sid)
             
         if expired_sessions:
-            logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
+            logger.info("Cleaned up %d expired sessions", len(expired_sessions))
+            self._release_memory()
+    
+    @staticmethod
+    def _release_memory():
+        """Collect session reference cycles and return freed heap to the OS."""
+        gc.collect()
+        if _malloc_trim is not None:
+            try:
+                _malloc_trim(0)
+            except Exception as e:
+                logger.debug("malloc_trim failed: %s", e)
 
 
 # Global session manager instance
@@ -1,14 +1,75 @@
 # pitext_travel/api/services/itinerary_service.py
 """Service layer for itinerary generation and management."""
 
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import orjson
 from flask import session
 
 from pitext_travel.api.llm import generate_trip_itinerary
 
 logger = logging.getLogger(__name__)
 
+# Spoken day explanations keyed by (itinerary hash, city, day number)
+_EXPLANATION_CACHE_SIZE = 256
+_explanation_cache: "OrderedDict[Tuple[str, str, int], str]" = OrderedDict()
+_explanation_lock = threading.Lock()
+
+# Server-side itinerary payloads; the session cookie only carries the id
+_ITINERARY_TTL_SECONDS = 3600
+_ITINERARY_STORE_SIZE = 1024
+_itinerary_store: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+_itinerary_lock = threading.Lock()
+
+
+def _store_put(itinerary: Dict[str, Any]) -> str:
+    """Keep an itinerary server-side and return its id."""
+    itinerary_id = secrets.token_urlsafe(8)
+    # Stored as JSON bytes: compact, and readers can't mutate the stored copy
+    payload = orjson.dumps(itinerary)
+    with _itinerary_lock:
+        _itinerary_store[itinerary_id] = (time.monotonic() + _ITINERARY_TTL_SECONDS, payload)
+        if len(_itinerary_store) > _ITINERARY_STORE_SIZE:
+            _itinerary_store.popitem(last=False)
+    return itinerary_id
+
+
+def _store_get(itinerary_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a stored itinerary, refreshing its TTL; None if gone."""
+    with _itinerary_lock:
+        entry = _itinerary_store.get(itinerary_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _itinerary_store[itinerary_id]
+            return None
+        _itinerary_store[itinerary_id] = (time.monotonic() + _ITINERARY_TTL_SECONDS, entry[1])
+        _itinerary_store.move_to_end(itinerary_id)
+        payload = entry[1]
+    return orjson.loads(payload)
+
+
+def _store_has(itinerary_id: Optional[str]) -> bool:
+    """Whether an itinerary is still stored and unexpired."""
+    if not itinerary_id:
+        return False
+    with _itinerary_lock:
+        entry = _itinerary_store.get(itinerary_id)
+        return entry is not None and entry[0] >= time.monotonic()
+
+
+def _store_delete(itinerary_id: Optional[str]) -> None:
+    """Drop a stored itinerary if present."""
+    if itinerary_id:
+        with _itinerary_lock:
+            _itinerary_store.pop(itinerary_id, None)
+
 
 class ItineraryService:
     """Handles itinerary generation and session management."""
@@ -49,14 +110,18 @@ class ItineraryService:
     
     @staticmethod
     def store_in_session(itinerary: Dict[str, Any], city: str, days: int) -> None:
-        """Store itinerary data in Flask session.
+        """Store itinerary data for the current Flask session.
+        
+        The itinerary itself stays in a server-side store; the cookie only
+        gets its id, so responses don't re-sign the whole payload.
         
         Args:
             itinerary: Generated itinerary data
             city: City name
             days: Number of days
         """
-        session['current_itinerary'] = itinerary
+        _store_delete(session.get('current_itinerary_id'))
+        session['current_itinerary_id'] = _store_put(itinerary)
         session['current_city'] = city
         session['current_days'] = days
         session.modified = True
@@ -67,9 +132,12 @@ class ItineraryService:
         """Get current itinerary from session.
         
         Returns:
-            Itinerary data or None if not found
+            Itinerary data or None if not found or expired
         """
-        return session.get('current_itinerary')
+        itinerary_id = session.get('current_itinerary_id')
+        if itinerary_id is None:
+            return None
+        return _store_get(itinerary_id)
     
     @staticmethod
     def get_session_info() -> Dict[str, Any]:
@@ -79,7 +147,8 @@ class ItineraryService:
             Dictionary with session info
         """
         return {
-            'has_itinerary': 'current_itinerary' in session,
+            # The cookie can outlive the entry (LRU eviction, TTL, restart)
+            'has_itinerary': _store_has(session.get('current_itinerary_id')),
             'current_city': session.get('current_city'),
             'current_days': session.get('current_days')
         }
@@ -87,7 +156,8 @@ class ItineraryService:
     @staticmethod
     def clear_session() -> None:
         """Clear itinerary data from session."""
-        keys_to_remove = ['current_itinerary', 'current_city', 'current_days']
+        _store_delete(session.get('current_itinerary_id'))
+        keys_to_remove = ['current_itinerary_id', 'current_city', 'current_days']
         for key in keys_to_remove:
             session.pop(key, None)
         session.modified = True
@@ -108,23 +178,35 @@ class ItineraryService:
         if not itinerary or 'days' not in itinerary:
             return f"I couldn't create an itinerary for {city}."
             
-        bullet_lines = []
+        parts = [f"Your {days}-day adventure in {city} is ready!"]
         for i, day in enumerate(itinerary['days'], 1):
             stops = ', '.join([s['name'] for s in day['stops']])
-            bullet_lines.append(f"Day {i}: {stops}.")
-            
-        voice_response = (
-            f"Your {days}-day adventure in {city} is ready! "
-            + " ".join(bullet_lines)
-            + " Say a day number if you'd like more detail."
-        )
+            parts.append(f"Day {i}: {stops}.")
+        parts.append("Say a day number if you'd like more detail.")
         
-        return voice_response
+        return " ".join(parts)
+    
+    @staticmethod
+    def itinerary_hash(itinerary: Dict[str, Any]) -> str:
+        """Stable short digest of an itinerary's content.
+        
+        Args:
+            itinerary: Itinerary data
+            
+        Returns:
+            16-character hex digest
+        """
+        payload = orjson.dumps(itinerary, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(payload, digest_size=8).hexdigest()
     
     @staticmethod
     def format_day_explanation(itinerary: Dict[str, Any], city: str, day_number: int) -> str:
         """Format explanation for a specific day.
         
+        Itineraries stamped with ``metadata['hash']`` (see itinerary_hash)
+        have their explanations cached, so repeated "tell me about day 2"
+        requests skip rebuilding the text.
+        
         Args:
             itinerary: Current itinerary data
             city: City name
@@ -136,34 +218,57 @@ class ItineraryService:
         if not itinerary or 'days' not in itinerary:
             return "I don't have a current itinerary to explain. Would you like me to plan a trip first?"
         
+        itinerary_hash = itinerary.get('metadata', {}).get('hash')
+        if not itinerary_hash:
+            return ItineraryService._build_day_explanation(itinerary, city, day_number)
+        
+        key = (itinerary_hash, city, day_number)
+        with _explanation_lock:
+            cached = _explanation_cache.get(key)
+            if cached is not None:
+                _explanation_cache.move_to_end(key)
+                return cached
+        
+        response = ItineraryService._build_day_explanation(itinerary, city, day_number)
+        
+        with _explanation_lock:
+            _explanation_cache[key] = response
+            if len(_explanation_cache) > _EXPLANATION_CACHE_SIZE:
+                _explanation_cache.popitem(last=False)
+        
+        return response
+    
+    @staticmethod
+    def _build_day_explanation(itinerary: Dict[str, Any], city: str, day_number: int) -> str:
+        """Build the explanation text for format_day_explanation."""
         days = itinerary['days']
         
         if day_number == 0:
             # Overview
-            response = f"Here's your complete {len(days)}-day itinerary for {city}: "
+            parts = [f"Here's your complete {len(days)}-day itinerary for {city}: "]
             
             for i, day in enumerate(days):
                 stops = [stop['name'] for stop in day['stops']]
-                response += f"Day {i + 1}: You'll visit {', '.join(stops)}. "
+                parts.append(f"Day {i + 1}: You'll visit {', '.join(stops)}. ")
             
-            response += "Which day would you like me to explain in more detail?"
+            parts.append("Which day would you like me to explain in more detail?")
             
         else:
             # Specific day
             if 0 < day_number <= len(days):
                 day = days[day_number - 1]
-                response = f"On day {day_number} in {city}, here's your plan: "
+                parts = [f"On day {day_number} in {city}, here's your plan: "]
                 
                 for j, stop in enumerate(day['stops'], 1):
-                    response += f"Stop {j}: {stop['name']}"
+                    parts.append(f"Stop {j}: {stop['name']}")
                     if 'placeType' in stop and stop['placeType']:
                         place_type = stop['placeType'].replace('_', ' ')
-                        response += f", which is a {place_type}"
-                    response += ". "
+                        parts.append(f", which is a {place_type}")
+                    parts.append(". ")
                 
-                response += f"That's {len(day['stops'])} amazing places to explore!"
+                parts.append(f"That's {len(day['stops'])} amazing places to explore!")
                 
             else:
-                response = f"I don't have information for day {day_number}. Your trip is {len(days)} days long."
+                return f"I don't have information for day {day_number}. Your trip is {len(days)} days long."
         
-        return response
\ No newline at end of file
+        return "".join(parts)
\ No newline at end of file
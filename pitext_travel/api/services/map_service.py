@@ -2,12 +2,44 @@
 """Service layer for map-related operations."""
 
 import logging
-from typing import Dict, Any, Optional, Tuple
+from enum import IntEnum
+from typing import Dict, Any, Optional, Tuple, Union
 
-from pitext_travel.api.geocoding import get_coordinates_for_place
+import numpy as np
+
+from pitext_travel.api.geocoding import batch_geocode_places, geocode_place
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_METERS = 6_371_000.0
+
+
+class TravelMode(IntEnum):
+    """Travel modes; values index _SPEEDS."""
+    DRIVING = 0
+    WALKING = 1
+    TRANSIT = 2
+    BICYCLING = 3
+
+
+# Average speeds in meters per minute, indexed by TravelMode
+_SPEEDS = np.array([
+    666,    # driving   ~40 km/h
+    83,     # walking   ~5 km/h
+    333,    # transit   ~20 km/h
+    250,    # bicycling ~15 km/h
+], dtype=np.float64)
+_SPEED_LIST = _SPEEDS.tolist()
+
+_MODE_BY_NAME = {mode.name.lower(): mode for mode in TravelMode}
+
+
+def _travel_mode(mode: Union[str, TravelMode]) -> TravelMode:
+    """Map a mode name (or TravelMode) to TravelMode, defaulting to driving."""
+    if isinstance(mode, TravelMode):
+        return mode
+    return _MODE_BY_NAME.get(mode, TravelMode.DRIVING)
+
 
 class MapService:
     """Handles map-related operations and geocoding."""
@@ -24,16 +56,13 @@ class MapService:
             Dictionary with lat/lng or None if not found
         """
         try:
-            # Combine place name with city for better results
-            query = f"{place_name}, {city}" if city else place_name
-            
-            coords = get_coordinates_for_place(query)
+            coords = geocode_place(place_name, city)
             
             if coords:
-                logger.debug(f"Geocoded '{query}' to {coords}")
-                return coords
+                logger.debug(f"Geocoded '{place_name}' to {coords}")
+                return {'lat': coords[0], 'lng': coords[1]}
             else:
-                logger.warning(f"Failed to geocode '{query}'")
+                logger.warning(f"Failed to geocode '{place_name}'")
                 return None
                 
         except Exception as e:
@@ -70,6 +99,7 @@ class MapService:
         city = itinerary.get('metadata', {}).get('city', '')
         geocoded_count = 0
         total_stops = 0
+        pending = []
         
         for day in itinerary['days']:
             for stop in day.get('stops', []):
@@ -83,19 +113,28 @@ class MapService:
                     geocoded_count += 1
                     continue
                 
-                # Try to geocode
-                coords = MapService.geocode_place(stop['name'], city)
-                
-                if coords:
-                    stop['location'] = coords
-                    geocoded_count += 1
-                else:
-                    # Use city center as fallback
-                    logger.warning(f"Using city center for '{stop['name']}'")
-                    stop['location'] = itinerary.get('metadata', {}).get('center', {
-                        'lat': 0,
-                        'lng': 0
-                    })
+                pending.append(stop)
+        
+        # Geocode the remaining stops in one concurrent batch
+        try:
+            found = batch_geocode_places([stop['name'] for stop in pending], city)
+        except Exception as e:
+            logger.error(f"Batch geocoding failed: {e}")
+            found = {}
+        
+        for stop in pending:
+            coords = found.get(stop['name'])
+            
+            if coords:
+                stop['location'] = {'lat': coords[0], 'lng': coords[1]}
+                geocoded_count += 1
+            else:
+                # Use city center as fallback
+                logger.warning(f"Using city center for '{stop['name']}'")
+                stop['location'] = itinerary.get('metadata', {}).get('center', {
+                    'lat': 0,
+                    'lng': 0
+                })
         
         logger.info(f"Geocoded {geocoded_count}/{total_stops} stops successfully")
         return itinerary
@@ -113,25 +152,58 @@ class MapService:
         if not itinerary or 'days' not in itinerary:
             return {}
             
-        lats = []
-        lngs = []
-        
-        for day in itinerary['days']:
-            for stop in day.get('stops', []):
-                if 'location' in stop:
-                    lats.append(stop['location']['lat'])
-                    lngs.append(stop['location']['lng'])
+        arrays = MapService.stop_arrays(itinerary)
+        lats = arrays['lat']
+        lngs = arrays['lng']
         
-        if not lats or not lngs:
+        if not lats.size:
             return {}
-            
+        
         return {
-            'north': max(lats),
-            'south': min(lats),
-            'east': max(lngs),
-            'west': min(lngs)
+            'north': float(lats.max()),
+            'south': float(lats.min()),
+            'east': float(lngs.max()),
+            'west': float(lngs.min())
         }
     
+    @staticmethod
+    def stop_arrays(itinerary: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Column view of the geocoded stops in an itinerary.
+        
+        The itinerary dicts stay the source of truth (they are what gets
+        serialised); this packs their coordinates into parallel arrays so
+        analytics can work on whole columns instead of nested dicts.
+        
+        Args:
+            itinerary: Itinerary with geocoded stops
+            
+        Returns:
+            Dictionary with float64 'lat' and 'lng' arrays and an int32
+            'day' array holding each stop's zero-based day index
+        """
+        days = itinerary.get('days', []) if itinerary else []
+        n = sum(
+            1 for day in days for stop in day.get('stops', [])
+            if stop.get('location') is not None
+        )
+        
+        lat = np.empty(n, dtype=np.float64)
+        lng = np.empty(n, dtype=np.float64)
+        day_idx = np.empty(n, dtype=np.int32)
+        
+        i = 0
+        for d, day in enumerate(days):
+            for stop in day.get('stops', []):
+                location = stop.get('location')
+                if location is None:
+                    continue
+                lat[i] = location['lat']
+                lng[i] = location['lng']
+                day_idx[i] = d
+                i += 1
+        
+        return {'lat': lat, 'lng': lng, 'day': day_idx}
+    
     @staticmethod
     def format_place_info(place_name: str, place_type: str = None) -> str:
         """Format place information for display.
@@ -150,27 +222,77 @@ class MapService:
         return place_name
     
     @staticmethod
-    def estimate_travel_time(distance_meters: float, mode: str = "driving") -> int:
+    def estimate_travel_time(distance_meters: float,
+                             mode: Union[str, TravelMode] = "driving") -> int:
         """Estimate travel time based on distance and mode.
         
         Args:
             distance_meters: Distance in meters
-            mode: Travel mode (driving, walking, transit)
+            mode: Travel mode name (driving, walking, transit, bicycling)
+                or TravelMode
             
         Returns:
             Estimated time in minutes
         """
-        # Average speeds in meters per minute
-        speeds = {
-            "driving": 666,    # ~40 km/h
-            "walking": 83,     # ~5 km/h  
-            "transit": 333,    # ~20 km/h
-            "bicycling": 250   # ~15 km/h
-        }
+        return max(1, int(distance_meters / _SPEED_LIST[_travel_mode(mode)]))
+    
+    @staticmethod
+    def estimate_travel_times(distances: np.ndarray, modes: np.ndarray) -> np.ndarray:
+        """Vectorised estimate_travel_time over parallel arrays.
         
-        speed = speeds.get(mode, speeds["driving"])
-        return max(1, int(distance_meters / speed))
+        Args:
+            distances: Distances in meters
+            modes: TravelMode values, one per distance
+            
+        Returns:
+            int32 array of minutes, each at least 1
+        """
+        return np.maximum(1, (distances / _SPEEDS[modes]).astype(np.int32))
+    
+    @staticmethod
+    def pairwise_distances(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Great-circle distance between every pair of points.
+        
+        Args:
+            lats: Latitudes in degrees, e.g. stop_arrays()['lat']
+            lngs: Longitudes in degrees
+            
+        Returns:
+            (n, n) array of haversine distances in meters
+        """
+        phi = np.radians(lats)
+        lam = np.radians(lngs)
+        
+        dphi = phi[:, None] - phi[None, :]
+        dlam = lam[:, None] - lam[None, :]
+        
+        a = (np.sin(dphi / 2) ** 2
+             + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(dlam / 2) ** 2)
+        return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    
+    @staticmethod
+    def pairwise_travel_minutes(lats: np.ndarray, lngs: np.ndarray,
+                                mode: Union[str, TravelMode] = "driving") -> np.ndarray:
+        """Estimated travel time between every pair of points.
+        
+        Vectorised counterpart of estimate_travel_time: same speeds and the
+        same one-minute floor, applied to the whole distance matrix.
+        
+        Args:
+            lats: Latitudes in degrees
+            lngs: Longitudes in degrees
+            mode: Travel mode (driving, walking, transit, bicycling)
+            
+        Returns:
+            (n, n) int array of minutes; the diagonal is zero
+        """
+        speed = _SPEEDS[_travel_mode(mode)]
+        minutes = np.maximum(
+            1, (MapService.pairwise_distances(lats, lngs) / speed).astype(np.int64)
+        )
+        np.fill_diagonal(minutes, 0)
+        return minutes
 
 
 # Export for use in other modules
-__all__ = ['MapService']
\ No newline at end of file
+__all__ = ['MapService', 'TravelMode']
\ No newline at end of file
@@ -2,11 +2,107 @@
 """Service layer for voice interaction functionality."""
 
 import logging
-from typing import Dict, Any, Optional, List
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+_ERROR_MESSAGES = MappingProxyType({
+    "no_city": "I didn't catch the city name. Could you please tell me which city you'd like to visit?",
+    "no_days": "How many days would you like to spend there?",
+    "invalid_days": "Please tell me a number of days between 1 and 14.",
+    "connection_lost": "I've lost the connection. Please click the microphone button to reconnect.",
+    "no_itinerary": "I don't have a current itinerary. Would you like me to plan a trip first?",
+    "unknown": "I'm sorry, something went wrong. Please try again."
+})
+_GENERATION_FAILED = "I'm sorry, I couldn't create an itinerary. {details}"
+
+_CONFIRMATIONS = MappingProxyType({
+    "trip_planned": "Perfect! I've created your {days}-day itinerary for {city}. You can see it on the map.",
+    "day_selected": "Now showing day {day} of your trip.",
+    "cleared": "I've cleared the map. Ready to plan a new trip!",
+    "listening": "I'm listening. Go ahead!",
+    "processing": "Let me process that for you..."
+})
+
+_VOICE_TIPS = (
+    "Plan a 3-day trip to Paris",
+    "Show me day 2",
+    "Explain the first day",
+    "Give me an overview",
+    "Plan a weekend in Tokyo",
+    "Clear the map"
+)
+
+# Common duration phrases
+_PHRASE_TO_DAYS = {
+    "a day": 1,
+    "one day": 1,
+    "1 day": 1,
+    "two days": 2,
+    "2 days": 2,
+    "three days": 3,
+    "3 days": 3,
+    "four days": 4,
+    "4 days": 4,
+    "five days": 5,
+    "5 days": 5,
+    "a week": 7,
+    "one week": 7,
+    "weekend": 2,
+    "long weekend": 3,
+    "extended weekend": 4,
+    "fortnight": 14,
+    "two weeks": 14
+}
+
+# Phrases or bare numbers in one pass. Longest phrases first so "long
+# weekend" wins over "weekend", and phrases before numbers so "1 day" is
+# read as a phrase.
+_DURATION_RE = re.compile(
+    r'\b(?:(?P<phrase>'
+    + '|'.join(map(re.escape, sorted(_PHRASE_TO_DAYS, key=len, reverse=True)))
+    + r')|(?P<num>\d+))\b'
+)
+
+# Whitespace-separated words, counted without building a list
+_WORD_RE = re.compile(r'\S+')
+
+_GREET_FALLBACK = ("Hi! I'm ready to help you plan your trip. Just tell me which "
+                   "city you'd like to visit and for how many days.")
+
+# Longest supported trip; larger day counts aren't worth caching
+_MAX_TRIP_DAYS = 14
+
+
+def _format_transition(to_day: int, total_days: int) -> str:
+    """Render the day-transition message for a 0-based day."""
+    # Convert to 1-based for user display
+    display_day = to_day + 1
+    
+    if to_day == 0:
+        return f"Showing day 1 of your {total_days}-day trip."
+    elif to_day == total_days - 1:
+        return f"Here's the final day, day {display_day} of your trip."
+    else:
+        return f"Now showing day {display_day} of {total_days}."
+
+
+@lru_cache(maxsize=64)
+def _greet_with(days: int, city: str) -> str:
+    """Greeting for a displayed itinerary; repeat greetings reuse the string."""
+    return (f"Great! I can see your {days}-day itinerary for {city} "
+            f"is displayed on the map. How can I help you with your trip planning?")
+
+
+@lru_cache(maxsize=32)
+def _transitions(total_days: int) -> Tuple[str, ...]:
+    """All transition messages for a trip length, rendered once."""
+    return tuple(_format_transition(day, total_days) for day in range(total_days))
+
 
 class VoiceService:
     """Handles voice-specific business logic and formatting."""
@@ -26,11 +122,8 @@ class VoiceService:
             Formatted greeting message
         """
         if has_itinerary and city and days:
-            return (f"Great! I can see your {days}-day itinerary for {city} "
-                   f"is displayed on the map. How can I help you with your trip planning?")
-        else:
-            return ("Hi! I'm ready to help you plan your trip. Just tell me which "
-                   "city you'd like to visit and for how many days.")
+            return _greet_with(days, city)
+        return _GREET_FALLBACK
     
     @staticmethod
     def format_voice_error(error_type: str, details: str = "") -> str:
@@ -43,17 +136,10 @@ class VoiceService:
         Returns:
             User-friendly error message
         """
-        error_messages = {
-            "no_city": "I didn't catch the city name. Could you please tell me which city you'd like to visit?",
-            "no_days": "How many days would you like to spend there?",
-            "invalid_days": "Please tell me a number of days between 1 and 14.",
-            "generation_failed": f"I'm sorry, I couldn't create an itinerary. {details}",
-            "connection_lost": "I've lost the connection. Please click the microphone button to reconnect.",
-            "no_itinerary": "I don't have a current itinerary. Would you like me to plan a trip first?",
-            "unknown": "I'm sorry, something went wrong. Please try again."
-        }
+        if error_type == "generation_failed":
+            return _GENERATION_FAILED.format(details=details)
         
-        return error_messages.get(error_type, error_messages["unknown"])
+        return _ERROR_MESSAGES.get(error_type, _ERROR_MESSAGES["unknown"])
     
     @staticmethod
     def parse_voice_duration(text: str) -> Optional[int]:
@@ -65,42 +151,18 @@ class VoiceService:
         Returns:
             Number of days or None if not found
         """
-        # Common duration patterns
-        duration_map = {
-            "a day": 1,
-            "one day": 1,
-            "1 day": 1,
-            "two days": 2,
-            "2 days": 2,
-            "three days": 3,
-            "3 days": 3,
-            "four days": 4,
-            "4 days": 4,
-            "five days": 5,
-            "5 days": 5,
-            "a week": 7,
-            "one week": 7,
-            "weekend": 2,
-            "long weekend": 3,
-            "extended weekend": 4,
-            "fortnight": 14,
-            "two weeks": 14
-        }
-        
-        text_lower = text.lower()
+        first_number = None
         
-        # Check for mapped durations
-        for phrase, days in duration_map.items():
-            if phrase in text_lower:
-                return days
+        # Mapped phrases take priority; otherwise fall back to the first number
+        for match in _DURATION_RE.finditer(text.lower()):
+            phrase = match.group('phrase')
+            if phrase is not None:
+                return _PHRASE_TO_DAYS[phrase]
+            if first_number is None:
+                first_number = int(match.group('num'))
         
-        # Try to extract numbers
-        import re
-        numbers = re.findall(r'\b(\d+)\b', text)
-        if numbers:
-            num = int(numbers[0])
-            if 1 <= num <= 14:
-                return num
+        if first_number is not None and 1 <= first_number <= 14:
+            return first_number
         
         return None
     
@@ -115,15 +177,7 @@ class VoiceService:
         Returns:
             Formatted confirmation message
         """
-        confirmations = {
-            "trip_planned": "Perfect! I've created your {days}-day itinerary for {city}. You can see it on the map.",
-            "day_selected": "Now showing day {day} of your trip.",
-            "cleared": "I've cleared the map. Ready to plan a new trip!",
-            "listening": "I'm listening. Go ahead!",
-            "processing": "Let me process that for you..."
-        }
-        
-        template = confirmations.get(action, "Done!")
+        template = _CONFIRMATIONS.get(action, "Done!")
         
         try:
             return template.format(**kwargs)
@@ -138,14 +192,7 @@ class VoiceService:
         Returns:
             List of voice command examples
         """
-        return [
-            "Plan a 3-day trip to Paris",
-            "Show me day 2",
-            "Explain the first day",
-            "Give me an overview",
-            "Plan a weekend in Tokyo",
-            "Clear the map"
-        ]
+        return list(_VOICE_TIPS)
     
     @staticmethod
     def format_day_transition(from_day: int, to_day: int, total_days: int) -> str:
@@ -159,15 +206,9 @@ class VoiceService:
         Returns:
             Formatted transition message
         """
-        # Convert to 1-based for user display
-        display_day = to_day + 1
-        
-        if to_day == 0:
-            return f"Showing day 1 of your {total_days}-day trip."
-        elif to_day == total_days - 1:
-            return f"Here's the final day, day {display_day} of your trip."
-        else:
-            return f"Now showing day {display_day} of {total_days}."
+        if 0 <= to_day < total_days <= _MAX_TRIP_DAYS:
+            return _transitions(total_days)[to_day]
+        return _format_transition(to_day, total_days)
     
     @staticmethod
     def estimate_speaking_duration(text: str) -> float:
@@ -179,9 +220,10 @@ class VoiceService:
         Returns:
             Estimated duration in seconds
         """
-        # Average speaking rate is ~150 words per minute
-        words = len(text.split())
-        return max(1.0, (words / 150.0) * 60)
+        # Average speaking rate is ~150 words per minute, i.e. 0.4s a word.
+        words = sum(1 for _ in _WORD_RE.finditer(text))
+        duration = 0.4 * words
+        return duration if duration > 1.0 else 1.0
 
 
 # Export for use in other modules
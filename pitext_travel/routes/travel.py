@@ -1,10 +1,90 @@
 # pitext_travel/routes/travel.py
 """Travel routes and blueprint configuration."""
 
+import hashlib
 import os
-from flask import Blueprint, render_template, jsonify, request, session
-from pitext_travel.api.llm import generate_trip_itinerary
+
+import orjson
+from flask import Blueprint, Response, abort, current_app, render_template, request
+from pitext_travel.api.llm import cached_trip_itinerary
 from pitext_travel.api.config import get_google_maps_config
+from pitext_travel.api.services.itinerary_service import ItineraryService
+
+# Served as-is by /travel/test-namespace
+_TEST_NAMESPACE_HTML = """\
+<!DOCTYPE html>
+<html>
+<head><title>Namespace Test</title></head>
+<body>
+  <h1>Namespace Registration Test</h1>
+  <div id="status">Testing...</div>
+  <div id="log"></div>
+  <script src="https://cdn.socket.io/4.7.4/socket.io.min.js"></script>
+  <script>
+    const status = document.getElementById('status');
+    const log = document.getElementById('log');
+    function add(msg){ log.innerHTML += `<p>${new Date().toISOString()}: ${msg}</p>`; }
+
+    add('Testing namespace registration...');
+
+    // Test 1: Try to connect to /travel/ws
+    add('Attempting to connect to /travel/ws...');
+    const travelSocket = io('/travel/ws', { 
+      path: '/socket.io',
+      transports: ['polling'],
+      timeout: 5000
+    });
+
+    travelSocket.on('connect', () => {
+      add('✅ SUCCESS: Connected to /travel/ws namespace');
+      status.textContent = 'Namespace is working!';
+
+      // Test ping
+      travelSocket.emit('ping');
+    });
+
+    travelSocket.on('pong', (data) => {
+      add(`✅ PING/PONG working: ${JSON.stringify(data)}`);
+    });
+
+    travelSocket.on('connect_error', (e) => {
+      add(`❌ FAILED to connect to /travel/ws: ${e.message}`);
+      status.textContent = 'Namespace registration failed';
+    });
+
+    // Test 2: Also test default namespace
+    add('Also testing default namespace...');
+    const defaultSocket = io('/', { 
+      path: '/socket.io',
+      transports: ['polling'],
+      timeout: 5000
+    });
+
+    defaultSocket.on('connect', () => {
+      add('⚠️ Connected to default namespace (this might be the fallback)');
+    });
+
+    defaultSocket.on('connect_error', (e) => {
+      add(`❌ Default namespace also failed: ${e.message}`);
+    });
+  </script>
+</body>
+</html>
+""".encode("utf-8")
+
+
+def _json(obj, status=200):
+    """JSON response encoded with orjson (bytes straight into the body)."""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def _itinerary_payload(city, days):
+    """Itinerary response shape shared by the default and POST paths."""
+    return {
+        "days": cached_trip_itinerary(city, days),
+        "metadata": {"city": city, "days": days}
+    }
+
 
 def create_travel_blueprint(base_dir):
     """Create and configure the travel blueprint.
@@ -15,38 +95,69 @@ def create_travel_blueprint(base_dir):
     Returns:
         Configured Flask Blueprint
     """
+    templates_dir = os.path.abspath(os.path.join(base_dir, 'templates'))
+    static_dir = os.path.abspath(os.path.join(base_dir, 'static'))
+    
     travel_bp = Blueprint(
         "travel",
         __name__,
-        template_folder=os.path.join(base_dir, 'templates'),
-        static_folder=os.path.join(base_dir, 'static'),
+        template_folder=templates_dir,
+        static_folder=static_dir,
         static_url_path='/static',
         url_prefix="/travel"
     )
     
+    # Maps config is fixed for the life of the process; serialise it once
+    maps_config = get_google_maps_config()
+    if maps_config.get("api_key"):
+        # API Key authentication
+        config_body = orjson.dumps({
+            "auth_type": "api_key",
+            "google_maps_api_key": maps_config["api_key"],
+            "google_maps_client_id": maps_config.get("client_id", ""),
+            "client_secret_configured": bool(maps_config.get("client_secret"))
+        })
+        config_status = 200
+    else:
+        config_body = orjson.dumps({
+            "error": "No Google Maps API key configured"
+        })
+        config_status = 500
+    
+    # Default Paris/3 itinerary body and ETag, built on first use
+    default_itinerary = {}
+    
+    def default_itinerary_response():
+        if not default_itinerary:
+            body = orjson.dumps(_itinerary_payload("Paris", 3))
+            default_itinerary["body"] = body
+            default_itinerary["etag"] = hashlib.blake2b(body, digest_size=8).hexdigest()
+        
+        etag = default_itinerary["etag"]
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+        return Response(default_itinerary["body"], mimetype="application/json",
+                        headers={"ETag": f'"{etag}"'})
+    
+    # map.html takes no context, so outside debug it is rendered once
+    rendered_pages = {}
+    
     @travel_bp.route("/")
     def index():
         """Main travel planner page."""
-        return render_template("map.html")
+        if current_app.debug:
+            return render_template("map.html")
+        
+        page = rendered_pages.get("map.html")
+        if page is None:
+            page = rendered_pages["map.html"] = render_template("map.html")
+        return page
     
     @travel_bp.route("/api/config")
     def api_config():
         """Return Google Maps configuration for frontend."""
-        config = get_google_maps_config()
-        
-        # Determine auth type and prepare response
-        if config.get("api_key"):
-            # API Key authentication
-            return jsonify({
-                "auth_type": "api_key",
-                "google_maps_api_key": config["api_key"],
-                "google_maps_client_id": config.get("client_id", ""),
-                "client_secret_configured": bool(config.get("client_secret"))
-            })
-        else:
-            return jsonify({
-                "error": "No Google Maps API key configured"
-            }), 500
+        # Fresh Response per request; only the body bytes are shared
+        return Response(config_body, status=config_status, mimetype="application/json")
     
     @travel_bp.route("/api/itinerary", methods=["GET", "POST"])
     def api_itinerary():
@@ -55,103 +166,43 @@ def create_travel_blueprint(base_dir):
             # Generate new itinerary
             data = request.get_json()
             city = data.get("city", "Paris")
-            days = data.get("days", 3)
+            # Clamp to the 1-14 days the planner supports before any LLM call
+            try:
+                days = int(data.get("days", 3))
+            except (TypeError, ValueError):
+                days = 3
+            days = 1 if days < 1 else 14 if days > 14 else days
             
             try:
-                itinerary = {
-                                "days": generate_trip_itinerary(city, days),
-                                "metadata": {"city": city, "days": days}
-                            }
-
-                # Store in session
-                session['current_itinerary'] = itinerary
-                session['current_city'] = city
-                session['current_days'] = days
+                itinerary = _itinerary_payload(city, days)
+
+                # Store server-side; the cookie only carries the id
+                ItineraryService.store_in_session(itinerary, city, days)
                 
-                return jsonify(itinerary)
+                return _json(itinerary)
             except Exception as e:
-                return jsonify({"error": str(e)}), 500
+                return _json({"error": str(e)}, 500)
         else:
             # Retrieve existing itinerary from session
-            itinerary = session.get('current_itinerary')
+            itinerary = ItineraryService.get_from_session()
             if itinerary:
-                return jsonify(itinerary)
-            else:
-                # Return default itinerary
-                    itinerary = {
-                                "days": generate_trip_itinerary("Paris", 3),
-                                "metadata": {"city": "Paris", "days": 3}
-                            }
-            return jsonify(itinerary)
+                return _json(itinerary)
+            
+            # Return default itinerary
+            return default_itinerary_response()
     
     @travel_bp.route("/test-namespace")
     def test_namespace():
         """Test if the /travel/ws namespace is properly registered."""
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head><title>Namespace Test</title></head>
-        <body>
-          <h1>Namespace Registration Test</h1>
-          <div id="status">Testing...</div>
-          <div id="log"></div>
-          <script src="https://cdn.socket.io/4.7.4/socket.io.min.js"></script>
-          <script>
-            const status = document.getElementById('status');
-            const log = document.getElementById('log');
-            function add(msg){ log.innerHTML += `<p>${new Date().toISOString()}: ${msg}</p>`; }
-
-            add('Testing namespace registration...');
-            
-            // Test 1: Try to connect to /travel/ws
-            add('Attempting to connect to /travel/ws...');
-            const travelSocket = io('/travel/ws', { 
-              path: '/socket.io',
-              transports: ['polling'],
-              timeout: 5000
-            });
-
-            travelSocket.on('connect', () => {
-              add('✅ SUCCESS: Connected to /travel/ws namespace');
-              status.textContent = 'Namespace is working!';
-              
-              // Test ping
-              travelSocket.emit('ping');
-            });
-            
-            travelSocket.on('pong', (data) => {
-              add(`✅ PING/PONG working: ${JSON.stringify(data)}`);
-            });
-            
-            travelSocket.on('connect_error', (e) => {
-              add(`❌ FAILED to connect to /travel/ws: ${e.message}`);
-              status.textContent = 'Namespace registration failed';
-            });
-            
-            // Test 2: Also test default namespace
-            add('Also testing default namespace...');
-            const defaultSocket = io('/', { 
-              path: '/socket.io',
-              transports: ['polling'],
-              timeout: 5000
-            });
-            
-            defaultSocket.on('connect', () => {
-              add('⚠️ Connected to default namespace (this might be the fallback)');
-            });
-            
-            defaultSocket.on('connect_error', (e) => {
-              add(`❌ Default namespace also failed: ${e.message}`);
-            });
-          </script>
-        </body>
-        </html>
-        """
+        # Diagnostic page only; production builds don't expose it
+        if not current_app.debug:
+            abort(404)
+        return Response(_TEST_NAMESPACE_HTML, content_type="text/html; charset=utf-8")
     
     @travel_bp.route("/health")
     def health():
         """Health check endpoint."""
-        return jsonify({"status": "ok", "service": "travel"})
+        return _json({"status": "ok", "service": "travel"})
     
     return travel_bp
 
@@ -29,19 +29,19 @@ def register_websocket_handlers(socketio):
         session_handler = SessionHandler(socketio, NAMESPACE)
         
         # Register handlers from each module
-        logger.info(f"Registering connection handler for namespace: {NAMESPACE}")
+        logger.info("Registering connection handler for namespace: %s", NAMESPACE)
         connection_handler.register_handlers()
         
-        logger.info(f"Registering audio handler for namespace: {NAMESPACE}")
+        logger.info("Registering audio handler for namespace: %s", NAMESPACE)
         audio_handler.register_handlers()
         
-        logger.info(f"Registering session handler for namespace: {NAMESPACE}")
+        logger.info("Registering session handler for namespace: %s", NAMESPACE)
         session_handler.register_handlers()
         
         logger.info("✅ Enhanced WebSocket handlers registered successfully")
         
     except Exception as e:
-        logger.error(f"❌ Failed to register WebSocket handlers: {e}")
+        logger.error("❌ Failed to register WebSocket handlers: %s", e)
         logger.exception("WebSocket registration error:")
         raise
 
@@ -1,14 +1,30 @@
 # pitext_travel/routes/websocket/audio.py
 """WebSocket handlers for audio data and control."""
 
-import base64
 import logging
-from flask import session
+from flask import request
 
-from .base import BaseWebSocketHandler, NAMESPACE
+from .base import (
+    AUDIO_STATS_EVERY,
+    BaseWebSocketHandler,
+    NAMESPACE,
+    audio_tally_by_sid,
+    realtime_session_by_sid,
+)
 
 logger = logging.getLogger(__name__)
 
+_BINARY_TYPES = (bytes, bytearray, memoryview)
+_base64_warned = False
+
+
+def _warn_base64_uplink():
+    """Log once per process that a client still sends base64 audio."""
+    global _base64_warned
+    if not _base64_warned:
+        _base64_warned = True
+        logger.warning("Base64 audio_data is deprecated; send raw PCM bytes instead")
+
 
 class AudioHandler(BaseWebSocketHandler):
     """Handles audio-related WebSocket events."""
@@ -19,37 +35,46 @@ class AudioHandler(BaseWebSocketHandler):
         @self.socketio.on("audio_data", namespace=NAMESPACE)
         def handle_audio_data(data):
             """Handle audio data from browser with improved error handling."""
-            session_id = session.get("realtime_session_id")
-            if session_id is None:
-                self.emit_to_client("error", {"message": "No session available"})
+            # start_session binds the Realtime session to the sid; without one
+            # the session isn't running and the frame has nowhere to go
+            realtime_session = realtime_session_by_sid.get(request.sid)
+            if realtime_session is None:
                 return
 
             try:
-                from pitext_travel.api.realtime.session_manager import get_session_manager
-
-                manager = get_session_manager()
-                realtime_session = manager.get_session(session_id)
-                if realtime_session and realtime_session.client:
-                    audio_b64 = data.get("audio")
-                    if not audio_b64:
-                        logger.warning("⚠️ No audio data in payload")
-                        return
-                    
-                    # Convert base64 to bytes for size calculation
-                    try:
-                        audio_bytes = base64.b64decode(audio_b64)
-                        audio_size = len(audio_bytes)
-                        
-                        # Only log substantial audio chunks to reduce noise
-                        if audio_size > 100:  
-                            logger.debug(f"🎤 Sending audio to Realtime API, size: {audio_size} bytes")
-                        
-                        realtime_session.client.send_audio(audio_bytes)
-                        manager.update_session_stats(session_id, audio_sent=audio_size)
-                        
-                    except Exception as decode_error:
-                        logger.error(f"❌ Failed to decode audio data: {decode_error}")
-                        self.emit_to_client("error", {"message": "Invalid audio data"})
+                # Raw bytes arrive as a Socket.IO binary attachment, either
+                # bare or as {"audio": <bytes>}; base64 strings are legacy
+                audio = data.get("audio") if isinstance(data, dict) else data
+                if not audio:
+                    logger.warning("⚠️ No audio data in payload")
+                    return
+                
+                client = realtime_session.client
+                if isinstance(audio, _BINARY_TYPES):
+                    send = client.send_audio
+                    audio_size = len(audio)
+                else:
+                    send = client.send_audio_b64
+                    _warn_base64_uplink()
+                    # The Realtime API wants base64 anyway, so forward it as-is;
+                    # the decoded size is only needed for stats
+                    audio_size = (len(audio) * 3) // 4 - audio.count("=", -2)
+                
+                # Only log substantial audio chunks to reduce noise
+                if audio_size > 100 and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("🎤 Sending audio to Realtime API, size: %d bytes", audio_size)
+                
+                send(audio)
+                
+                # Count locally and report to the session manager every
+                # AUDIO_STATS_EVERY frames; disconnect flushes the remainder
+                tally = audio_tally_by_sid.get(request.sid)
+                if tally is not None:
+                    tally[0] += 1
+                    tally[1] += audio_size
+                    if tally[0] & (AUDIO_STATS_EVERY - 1) == 0:
+                        self.manager.update_session_stats(realtime_session.session_id, audio_sent=tally[1])
+                        tally[1] = 0
                     
             except Exception as exc:
                 self.handle_error(exc, "audio_data")
@@ -57,34 +82,26 @@ class AudioHandler(BaseWebSocketHandler):
         @self.socketio.on("commit_audio", namespace=NAMESPACE)
         def handle_commit_audio():
             """Commit audio buffer and request response."""
-            session_id = session.get("realtime_session_id")
-            if session_id is None:
+            realtime_session = realtime_session_by_sid.get(request.sid)
+            if realtime_session is None:
                 return
 
             try:
-                from pitext_travel.api.realtime.session_manager import get_session_manager
-
-                realtime_session = get_session_manager().get_session(session_id)
-                if realtime_session and realtime_session.client:
-                    realtime_session.client.commit_audio()
-                    logger.debug(f"✅ Audio committed for session {session_id}")
+                realtime_session.client.commit_audio()
+                logger.debug("✅ Audio committed for session %s", realtime_session.session_id)
             except Exception as exc:
                 self.handle_error(exc, "commit_audio")
 
         @self.socketio.on("interrupt", namespace=NAMESPACE)
         def handle_interrupt():
             """Handle interrupt request."""
-            session_id = session.get("realtime_session_id")
-            if session_id is None:
+            realtime_session = realtime_session_by_sid.get(request.sid)
+            if realtime_session is None:
                 return
 
             try:
-                from pitext_travel.api.realtime.session_manager import get_session_manager
-
-                realtime_session = get_session_manager().get_session(session_id)
-                if realtime_session and realtime_session.client:
-                    realtime_session.client.interrupt()
-                    self.emit_to_client("interrupted", {"status": "interrupted"})
-                    logger.info(f"🛑 Interrupt sent for session {session_id}")
+                realtime_session.client.interrupt()
+                self.emit_to_client("interrupted", {"status": "interrupted"})
+                logger.info("🛑 Interrupt sent for session %s", realtime_session.session_id)
             except Exception as exc:
                 self.handle_error(exc, "interrupt")
\ No newline at end of file
@@ -2,14 +2,32 @@
 """Base WebSocket handler with common functionality."""
 
 import logging
+from typing import Any, Callable, Dict, List, Optional
 from flask import request, session
 from flask_socketio import emit
 
+from pitext_travel.api.realtime.session_manager import get_session_manager
+
 logger = logging.getLogger(__name__)
 
 # Define namespace constant
 NAMESPACE = "/travel/ws"
 
+# Realtime session id created for each connection, keyed by Socket.IO sid;
+# handlers read it instead of going through the Flask session proxy
+realtime_id_by_sid: Dict[str, str] = {}
+
+# Realtime session bound to each started connection, keyed by Socket.IO sid,
+# so per-frame handlers skip the Flask session and session manager lookups
+realtime_session_by_sid: Dict[str, Any] = {}
+# Detach functions from wire_realtime_callbacks, called on disconnect
+detach_callbacks_by_sid: Dict[str, Callable[[], None]] = {}
+# Uplink audio not yet reported to the session manager: [frames, bytes] per sid
+audio_tally_by_sid: Dict[str, List[int]] = {}
+
+# Uplink frames between session manager stat updates; keep a power of two
+AUDIO_STATS_EVERY = 32
+
 
 class BaseWebSocketHandler:
     """Base class for WebSocket handlers with common functionality."""
@@ -17,6 +35,8 @@ class BaseWebSocketHandler:
     def __init__(self, socketio, namespace=NAMESPACE):
         self.socketio = socketio
         self.namespace = namespace
+        # The session manager is a process-wide singleton; resolve it once
+        self.manager = get_session_manager()
         
     def emit_to_client(self, event, data, room=None):
         """Emit event to a specific client or room."""
@@ -26,7 +46,33 @@ class BaseWebSocketHandler:
             else:
                 emit(event, data, namespace=self.namespace)
         except Exception as e:
-            logger.error(f"Failed to emit {event}: {e}")
+            logger.error("Failed to emit %s: %s", event, e)
+            
+    def bind_realtime_session(self, sid, realtime_session,
+                              detach_callbacks: Optional[Callable[[], None]] = None):
+        """Cache a started Realtime session for the connection's sid."""
+        realtime_session_by_sid[sid] = realtime_session
+        audio_tally_by_sid.setdefault(sid, [0, 0])
+        if detach_callbacks is not None:
+            detach_callbacks_by_sid[sid] = detach_callbacks
+    
+    def unbind_realtime_session(self, sid):
+        """Drop the cached Realtime session for a closed connection."""
+        detach = detach_callbacks_by_sid.pop(sid, None)
+        if detach is not None:
+            detach()
+        self.flush_audio_tally(sid)
+        realtime_session_by_sid.pop(sid, None)
+        audio_tally_by_sid.pop(sid, None)
+    
+    def flush_audio_tally(self, sid):
+        """Report uplink audio bytes counted since the last flush."""
+        realtime_session = realtime_session_by_sid.get(sid)
+        tally = audio_tally_by_sid.get(sid)
+        if realtime_session is None or tally is None or not tally[1]:
+            return
+        self.manager.update_session_stats(realtime_session.session_id, audio_sent=tally[1])
+        tally[1] = 0
             
     def get_client_info(self):
         """Get information about the connected client."""
@@ -41,12 +87,12 @@ class BaseWebSocketHandler:
         """Log WebSocket events consistently."""
         client_info = self.get_client_info()
         if data:
-            logger.info(f"[WS] {event_name} - Client: {client_info['sid']}, Data: {data}")
+            logger.info("[WS] %s - Client: %s, Data: %s", event_name, client_info['sid'], data)
         else:
-            logger.info(f"[WS] {event_name} - Client: {client_info['sid']}")
+            logger.info("[WS] %s - Client: %s", event_name, client_info['sid'])
             
     def handle_error(self, error, event_name=""):
         """Handle and log errors consistently."""
         client_info = self.get_client_info()
-        logger.error(f"[WS] Error in {event_name} - Client: {client_info['sid']}, Error: {error}")
+        logger.error("[WS] Error in %s - Client: %s, Error: %s", event_name, client_info['sid'], error)
         self.emit_to_client('error', {'message': str(error), 'event': event_name})
\ No newline at end of file
@@ -1,120 +1,249 @@
 # pitext_travel/routes/websocket/callback_helpers.py
 """Helper functions for wiring Realtime API callbacks to Socket.IO events."""
 
-import base64
 import logging
+import threading
 import time
-from typing import Optional
+from collections import deque
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, Optional
+
+from pitext_travel.api.config import get_realtime_config
+from pitext_travel.api.models import CurrentItinerary
+from pitext_travel.api.realtime.audio_handler import b64decode_audio, b64encode_audio
 
 logger = logging.getLogger(__name__)
 
+# Chunks held for a slow browser before the oldest are dropped
+_AUDIO_PENDING_MAX = 256
+
+
+def _post_plan_trip(realtime_session, result: dict, emit_render) -> dict:
+    """Store a planned trip on the session and send it to the map."""
+    # The full tree rides along with this call's result for the map only;
+    # it must not go back to OpenAI
+    itinerary = result.pop("_itinerary", None)
+    if not result.get("success") or itinerary is None:
+        return result
+    
+    logger.info("✅ Trip planned successfully via voice")
+    
+    # Keep it on the realtime session for explain_day
+    realtime_session.itinerary = CurrentItinerary(itinerary, result['city'], result['days'])
+    
+    # Emit to frontend with enhanced data
+    emit_render({
+        "itinerary": itinerary,
+        "city": result.get("city"),
+        "days": result.get("days"),
+        "source": "voice",
+        "timestamp": time.time()
+    })
+    
+    logger.info("🗺️ Emitted render_itinerary for %s", result.get('city'))
+    return result
+
 
-def wire_realtime_callbacks(socketio, realtime_session, sid: str, namespace: str = "/travel/ws") -> None:
+def _post_explain_day(realtime_session, result: dict, emit_render) -> dict:
+    """Fill in the spoken explanation from the session's current itinerary."""
+    if not result.get("needs_session_data"):
+        return result
+    
+    current = realtime_session.itinerary
+    if current is None or not current.data:
+        logger.warning("No current itinerary found for explain_day")
+        return {
+            "success": False,
+            "error": "No current itinerary available",
+            "voice_response": "I don't have a current itinerary to explain. Would you like me to plan a trip first?"
+        }
+    
+    # Update result with formatted response
+    result['voice_response'] = realtime_session.function_handler.format_explain_day_response(
+        current.data,
+        current.city or 'your destination',
+        result.get('day_number', 0)
+    )
+    result['success'] = True
+    
+    logger.info("📝 Explained day %s via voice", result.get('day_number'))
+    return result
+
+
+def _join_b64(pieces: list) -> str:
+    """Join base64 audio deltas into one base64 string.
+
+    Plain concatenation is valid while no piece but the last is padded,
+    which holds for 3-byte-aligned deltas; otherwise re-encode once.
+    """
+    if len(pieces) == 1:
+        return pieces[0]
+    if not any(piece.endswith("=") for piece in pieces[:-1]):
+        return "".join(pieces)
+    return b64encode_audio(b"".join([b64decode_audio(piece) for piece in pieces]))
+
+
+# Per-function post-processing between the handler result and the reply to OpenAI
+_FUNCTION_POST = {
+    "plan_trip": _post_plan_trip,
+    "explain_day": _post_explain_day,
+}
+
+
+def wire_realtime_callbacks(socketio, realtime_session, sid: str,
+                            namespace: str = "/travel/ws") -> Optional[Callable[[], None]]:
     """
     Enhanced callback wiring for better voice-map integration.
     Bridges Realtime-API callbacks → Socket.IO events.
+
+    Returns a detach function to call when the browser disconnects; after
+    it the callbacks return immediately instead of emitting to a gone sid.
     """
     client = realtime_session.client
     if client is None:
-        return
+        return None
 
-    # -- audio ----------------------------------------------------------------
-    def _on_audio_chunk(chunk: bytes, item_id: Optional[str] = None) -> None:
-        try:
-            socketio.emit(
-                "audio_chunk",
-                {
-                    "audio": base64.b64encode(chunk).decode(),
-                    "item_id": item_id,
-                },
-                room=sid,
-                namespace=namespace,
-            )
-        except Exception as exc:
-            logger.exception("Failed emitting audio_chunk: %s", exc)
+    # Cleared by detach(); checked on entry by every emitting callback
+    alive = True
+
+    # One emitter per event with the recipient bound once. They go straight
+    # to the python-socketio server: these callbacks run outside any Flask
+    # request, so Flask-SocketIO's emit wrapper has nothing to add.
+    # Events go to the socket's own sid room only: another tab or a
+    # reconnect sharing the Flask session must not hear this one's audio.
+    server_emit = socketio.server.emit
+    _emit_audio = partial(server_emit, "audio_chunk", to=sid, namespace=namespace)
+    _emit_transcript = partial(server_emit, "transcript", to=sid, namespace=namespace)
+    _emit_render = partial(server_emit, "render_itinerary", to=sid, namespace=namespace)
+    _emit_error = partial(server_emit, "error", to=sid, namespace=namespace)
+    _emit_session_update = partial(server_emit, "session_update", to=sid, namespace=namespace)
+    _emit_speech_started = partial(server_emit, "speech_started", to=sid, namespace=namespace)
+    _emit_speech_stopped = partial(server_emit, "speech_stopped", to=sid, namespace=namespace)
+
+    # -- outbound queue ---------------------------------------------------------
+    # Callbacks run on the Realtime client's threads and only queue; a single
+    # flusher task per session does the emitting, so a slow browser socket
+    # never holds up reading the next Realtime event.
+    # Audio is flushed every AUDIO_COALESCE_MS window, joining consecutive
+    # chunks of the same item into one audio_chunk. The event shape is
+    # unchanged, so the browser decoder needs no change.
+    # The audio queue is bounded: if the browser can't keep up, stale audio
+    # is dropped rather than delaying the Realtime client's audio pump.
+    # Unless AUDIO_BINARY=0 the PCM goes out as a binary attachment; the
+    # player takes either an ArrayBuffer or a base64 string. In base64 mode
+    # the client passes the Realtime deltas through without decoding.
+    audio_format = get_realtime_config()["audio_format"]
+    binary_audio = audio_format["binary"]
+    coalesce_seconds = audio_format["coalesce_ms"] / 1000
+    client.audio_as_b64 = not binary_audio
+    join_audio = b"".join if binary_audio else _join_b64
+    pending_audio: deque = deque(maxlen=_AUDIO_PENDING_MAX)
+    # Other events as (emitter, payload); low-rate, so never dropped
+    pending_events: deque = deque()
+    pending_lock = threading.Lock()
+    flush_scheduled = False
+    dropped_chunks = 0
+    # Bound once so the per-chunk paths don't repeat attribute lookups
+    sleep = socketio.sleep
+    start_background_task = socketio.start_background_task
+    chunk_item_id = itemgetter(1)
+    # Reused for every audio_chunk: python-socketio encodes the packet before
+    # emit returns, and only the single flusher task touches it
+    audio_payload = {"audio": None, "item_id": None}
+
+    def _flush() -> None:
+        nonlocal flush_scheduled, dropped_chunks
+        while True:
+            sleep(coalesce_seconds)
+            with pending_lock:
+                if not alive or not (pending_audio or pending_events):
+                    pending_audio.clear()
+                    pending_events.clear()
+                    flush_scheduled = False
+                    return
+                events = list(pending_events)
+                pending_events.clear()
+                chunks = list(pending_audio)
+                pending_audio.clear()
+                dropped, dropped_chunks = dropped_chunks, 0
+
+            for emit, payload in events:
+                try:
+                    emit(payload)
+                except Exception as exc:
+                    logger.exception("Failed emitting %s: %s", emit.args[0], exc)
+
+            if dropped:
+                logger.warning("Dropped %d stale audio chunks for %s", dropped, sid)
+
+            for item_id, run in groupby(chunks, key=chunk_item_id):
+                audio_payload["audio"] = join_audio([chunk for chunk, _ in run])
+                audio_payload["item_id"] = item_id
+                try:
+                    _emit_audio(audio_payload)
+                except Exception as exc:
+                    logger.exception("Failed emitting audio_chunk: %s", exc)
+
+    def _enqueue_event(emit, payload) -> None:
+        nonlocal flush_scheduled
+        with pending_lock:
+            pending_events.append((emit, payload))
+            if flush_scheduled:
+                return
+            flush_scheduled = True
+        start_background_task(_flush)
+
+    def _on_audio_chunk(chunk, item_id: Optional[str] = None) -> None:
+        nonlocal flush_scheduled, dropped_chunks
+        if not alive:
+            return
+        with pending_lock:
+            if len(pending_audio) == _AUDIO_PENDING_MAX:
+                dropped_chunks += 1
+            pending_audio.append((chunk, item_id))
+            if flush_scheduled:
+                return
+            flush_scheduled = True
+        start_background_task(_flush)
 
     # -- transcript -----------------------------------------------------------
+    # Deltas are appended client-side, so each one is sent; only a repeated
+    # final (full-text) update for the same item is dropped.
+    last_final = None
+
     def _on_transcript(text: str, item_id: Optional[str], is_final: bool) -> None:
-        try:
-            socketio.emit(
-                "transcript",
-                {
-                    "text": text,
-                    "item_id": item_id,
-                    "is_final": is_final,
-                    "role": "assistant"
-                },
-                room=sid,
-                namespace=namespace,
-            )
-        except Exception as exc:
-            logger.exception("Failed emitting transcript: %s", exc)
+        nonlocal last_final
+        if not alive:
+            return
+        if is_final:
+            key = (item_id, text)
+            if key == last_final:
+                return
+            last_final = key
+        _enqueue_event(_emit_transcript, {
+            "text": text,
+            "item_id": item_id,
+            "is_final": is_final,
+            "role": "assistant"
+        })
 
     def _on_function_call(call_id: str, name: str, args: dict) -> None:
         try:
-            logger.info(f"🎤 Processing function call: {name} with args: {args}")
+            logger.info("🎤 Processing function call: %s with args: %s", name, args)
             
-            if hasattr(realtime_session, 'function_handler'):
-                result = realtime_session.function_handler.handle_function_call(
-                    call_id, name, args
+            fh = realtime_session.function_handler
+            if fh is not None:
+                # Itinerary generation takes seconds; run it on the shared pool
+                # so the Realtime receive thread keeps streaming audio.
+                future = fh.submit_function_call(call_id, name, args)
+                future.add_done_callback(
+                    lambda done: _complete_function_call(call_id, name, done.result())
                 )
-                
-                # Enhanced handling for plan_trip
-                if name == "plan_trip" and result.get("success"):
-                    logger.info("✅ Trip planned successfully via voice")
-                    
-                    # Store in the realtime session's conversation data instead
-                    realtime_session.conversation_data['current_itinerary'] = result['itinerary']
-                    realtime_session.conversation_data['current_city'] = result['city']
-                    realtime_session.conversation_data['current_days'] = result['days']
-                    
-                    # Emit to frontend with enhanced data
-                    socketio.emit(
-                        "render_itinerary",
-                        {
-                            "itinerary": result.get("itinerary"),
-                            "city": result.get("city"),
-                            "days": result.get("days"),
-                            "source": "voice",
-                            "timestamp": time.time()
-                        },
-                        room=sid,
-                        namespace=namespace
-                    )
-                    
-                    logger.info(f"🗺️ Emitted render_itinerary for {result.get('city')}")
-                    
-                # Enhanced handling for explain_day
-                elif name == "explain_day" and result.get("needs_session_data"):
-                    # Get data from realtime session's conversation data
-                    current_itinerary = realtime_session.conversation_data.get('current_itinerary')
-                    current_city = realtime_session.conversation_data.get('current_city', 'your destination')
-                    
-                    if current_itinerary:
-                        voice_response = realtime_session.function_handler.format_explain_day_response(
-                            current_itinerary,
-                            current_city,
-                            result.get('day_number', 0)
-                        )
-                        
-                        # Update result with formatted response
-                        result['voice_response'] = voice_response
-                        result['success'] = True
-                        
-                        logger.info(f"📝 Explained day {result.get('day_number')} via voice")
-                    else:
-                        logger.warning("No current itinerary found for explain_day")
-                        result = {
-                            "success": False,
-                            "error": "No current itinerary available",
-                            "voice_response": "I don't have a current itinerary to explain. Would you like me to plan a trip first?"
-                        }
-
-                # Send final result back to OpenAI
-                realtime_session.client.send_function_result(call_id, result)
                         
             else:
-                logger.error(f"❌ No function handler available for session {realtime_session.session_id}")
+                logger.error("❌ No function handler available for session %s", realtime_session.session_id)
                 error_result = {
                     "success": False,
                     "error": "Function handler not available",
@@ -132,56 +261,50 @@ def wire_realtime_callbacks(socketio, realtime_session, sid: str, namespace: str
                 "function": name
             }
             realtime_session.client.send_function_result(call_id, error_result)
+
+    def _queue_render(payload: dict) -> None:
+        # Runs on a pool worker; the flusher task does the actual emit
+        if alive:
+            _enqueue_event(_emit_render, payload)
+
+    def _complete_function_call(call_id: str, name: str, result: dict) -> None:
+        try:
+            post = _FUNCTION_POST.get(name)
+            if post is not None:
+                result = post(realtime_session, result, _queue_render)
+        except Exception as exc:
+            logger.exception("❌ Failed handling function call: %s", exc)
+            result = {
+                "success": False,
+                "error": str(exc),
+                "call_id": call_id,
+                "function": name
+            }
+
+        # Send the final result back to OpenAI exactly once
+        realtime_session.client.send_function_result(call_id, result)
     
     # -- error handling -------------------------------------------------------
     def _on_error(error: str) -> None:
-        try:
-            logger.error(f"🚫 Realtime API error: {error}")
-            socketio.emit(
-                "error",
-                {"message": error, "source": "realtime_api"},
-                room=sid,
-                namespace=namespace,
-            )
-        except Exception as exc:
-            logger.exception("Failed emitting error: %s", exc)
+        logger.error("🚫 Realtime API error: %s", error)
+        if alive:
+            _enqueue_event(_emit_error, {"message": error, "source": "realtime_api"})
 
     # -- session updates ------------------------------------------------------
     def _on_session_update(session_data: dict) -> None:
-        try:
-            socketio.emit(
-                "session_update",
-                session_data,
-                room=sid,
-                namespace=namespace,
-            )
-        except Exception as exc:
-            logger.exception("Failed emitting session_update: %s", exc)
+        if alive:
+            _enqueue_event(_emit_session_update, session_data)
 
     # -- Enhanced VAD event handlers ------------------------------------------
     def _on_speech_started(event: dict) -> None:
-        try:
-            logger.debug("🎤 OpenAI VAD: Speech started")
-            socketio.emit(
-                "speech_started",
-                event,
-                room=sid,
-                namespace=namespace,
-            )
-        except Exception as exc:
-            logger.exception("Failed emitting speech_started: %s", exc)
+        logger.debug("🎤 OpenAI VAD: Speech started")
+        if alive:
+            _enqueue_event(_emit_speech_started, event)
 
     def _on_speech_stopped(event: dict) -> None:
-        try:
-            logger.debug("🔇 OpenAI VAD: Speech stopped")
-            socketio.emit(
-                "speech_stopped", 
-                event,
-                room=sid,
-                namespace=namespace,
-            )
-        except Exception as exc:
-            logger.exception("Failed emitting speech_stopped: %s", exc)
+        logger.debug("🔇 OpenAI VAD: Speech stopped")
+        if alive:
+            _enqueue_event(_emit_speech_stopped, event)
 
     # Wire up all callbacks
     client.on_audio_chunk = _on_audio_chunk
@@ -190,4 +313,10 @@ def wire_realtime_callbacks(socketio, realtime_session, sid: str, namespace: str
     client.on_error = _on_error
     client.on_session_update = _on_session_update
     client.on_speech_started = _on_speech_started
-    client.on_speech_stopped = _on_speech_stopped
\ No newline at end of file
+    client.on_speech_stopped = _on_speech_stopped
+
+    def detach() -> None:
+        nonlocal alive
+        alive = False
+
+    return detach
\ No newline at end of file
@@ -6,7 +6,7 @@ import logging
 from flask import session, request
 from flask_socketio import disconnect
 
-from .base import BaseWebSocketHandler, NAMESPACE
+from .base import BaseWebSocketHandler, NAMESPACE, realtime_id_by_sid
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +24,8 @@ class ConnectionHandler(BaseWebSocketHandler):
             self.log_event('connect', {'auth': auth})
             
             # Add detailed logging for debugging
-            logger.info(f"🔗 Client connected to /travel/ws namespace: {client_info['sid']}")
-            logger.info(f"📋 Flask session keys: {list(session.keys())}")
+            logger.info("🔗 Client connected to /travel/ws namespace: %s", client_info['sid'])
+            logger.info("📋 Flask session keys: %s", list(session.keys()))
             
             try:
                 # Ensure Flask session has an ID
@@ -33,90 +33,73 @@ class ConnectionHandler(BaseWebSocketHandler):
                     session['_id'] = client_info['flask_session_id']
                     session.modified = True
                 
-                # Create Realtime session with error handling
-                try:
-                    from pitext_travel.api.realtime.session_manager import get_session_manager
-                    
-                    manager = get_session_manager()
-                    realtime_session = manager.create_session(
-                        client_info['ip'], 
-                        session['_id']
-                    )
-                    
-                    if not realtime_session:
-                        logger.error("❌ Failed to create realtime session - rate limited")
-                        self.emit_to_client('error', {
-                            'message': 'Rate limit exceeded or server at capacity'
-                        })
-                        disconnect()
-                        return
-                    
-                    # Store session ID in SocketIO session
-                    session['realtime_session_id'] = realtime_session.session_id
-                    
-                    logger.info(f"✅ Session ready: {realtime_session.session_id}")
-                    logger.info(f"🔍 Session keys after setup: {list(session.keys())}")
-                    
-                    self.emit_to_client('connected', {
-                        'session_id': realtime_session.session_id,
-                        'status': 'connected',
-                        'flask_session_id': session['_id']
-                    })
-                    
-                except ImportError as e:
-                    logger.warning(f"Session manager not available: {e}")
-                    # Fallback to basic connection
-                    self.emit_to_client('connected', {
-                        'session_id': client_info['sid'],
-                        'status': 'connected_basic',
-                        'flask_session_id': session['_id']
+                # Create Realtime session
+                realtime_session = self.manager.create_session(
+                    client_info['ip'], 
+                    session['_id'],
+                    forwarded_for=request.headers.get('X-Forwarded-For')
+                )
+                
+                if not realtime_session:
+                    logger.error("❌ Failed to create realtime session - rate limited")
+                    self.emit_to_client('error', {
+                        'message': 'Rate limit exceeded or server at capacity'
                     })
+                    disconnect()
+                    return
+                
+                # Remember the Realtime session for this connection
+                realtime_id_by_sid[request.sid] = realtime_session.session_id
+                
+                logger.info("✅ Session ready: %s", realtime_session.session_id)
+                logger.info("🔍 Session keys after setup: %s", list(session.keys()))
+                
+                self.emit_to_client('connected', {
+                    'session_id': realtime_session.session_id,
+                    'status': 'connected',
+                    'flask_session_id': session['_id']
+                })
                 
             except Exception as e:
-                logger.error(f"Connection error: {e}")
+                logger.error("Connection error: %s", e)
                 self.handle_error(e, 'connect')
                 disconnect()
         
         @self.socketio.on('disconnect', namespace=NAMESPACE)
         def handle_disconnect():
             """Handle WebSocket disconnection."""
-            session_id = session.get('realtime_session_id')
+            self.unbind_realtime_session(request.sid)
+            session_id = realtime_id_by_sid.pop(request.sid, None)
             
             if session_id:
                 try:
-                    from pitext_travel.api.realtime.session_manager import get_session_manager
-                    manager = get_session_manager()
-                    manager.deactivate_session(session_id, 'client_disconnect')
-                    logger.info(f"🔌 WebSocket disconnected, session {session_id} deactivated")
-                except ImportError:
-                    logger.warning("Session manager not available during disconnect")
+                    self.manager.deactivate_session(session_id, 'client_disconnect')
+                    logger.info("🔌 WebSocket disconnected, session %s deactivated", session_id)
                 except Exception as e:
                     self.handle_error(e, 'disconnect')
             else:
                 self.log_event('disconnect', {'no_session': True})
         
-        @self.socketio.on('ping', namespace=NAMESPACE)
-        def handle_ping():
+        # Registered on the python-socketio server directly: a keepalive
+        # needs no Flask request context or signed-cookie session load
+        server = self.socketio.server
+        server_emit = server.emit
+        # Wall-clock time, not monotonic: the browser compares it with Date.now()
+        wall_clock = time.time
+        
+        @server.on('ping', namespace=NAMESPACE)
+        def handle_ping(sid, data=None):
             """Handle ping for connection testing."""
-            self.emit_to_client('pong', {'timestamp': time.time()})
+            pong = {'timestamp': wall_clock()}
+            server_emit('pong', pong, to=sid, namespace=NAMESPACE)
+            return pong
         
         @self.socketio.on('test', namespace=NAMESPACE)
         def handle_test(data):
             """Handle test event for debugging."""
-            logger.info(f"Test event received: {data}")
+            logger.info("Test event received: %s", data)
             self.emit_to_client('test_response', {
                 'message': 'Test successful',
                 'received_data': data,
                 'timestamp': time.time()
             })
-        
-        # Register default namespace handlers for compatibility
-        @self.socketio.on("connect")
-        def handle_default_connect():
-            """Default namespace connection handler."""
-            logger.info("Client connected to default namespace")
-            
-        @self.socketio.on("disconnect")
-        def handle_default_disconnect():
-            """Default namespace disconnection handler."""
-            logger.info("Client disconnected from default namespace")
\ No newline at end of file
@@ -5,7 +5,10 @@ import logging
 import time
 from flask import request, session
 
-from .base import BaseWebSocketHandler, NAMESPACE
+from .base import BaseWebSocketHandler, NAMESPACE, realtime_id_by_sid, realtime_session_by_sid
+from pitext_travel.api.realtime.function_handler import create_function_handler
+from pitext_travel.api.services.itinerary_service import ItineraryService
+from pitext_travel.api.services.voice_service import VoiceService
 from pitext_travel.routes.websocket.callback_helpers import wire_realtime_callbacks
 
 logger = logging.getLogger(__name__)
@@ -20,28 +23,26 @@ class SessionHandler(BaseWebSocketHandler):
         @self.socketio.on("start_session", namespace=NAMESPACE)
         def handle_start_session(data):
             """Start OpenAI Realtime API session with enhanced initialization."""
-            session_id = session.get("realtime_session_id")
-            logger.info(f"🔍 start_session called - session_id: {session_id}, session keys: {list(session.keys())}")
+            session_id = realtime_id_by_sid.get(request.sid)
+            logger.info("🔍 start_session called - session_id: %s", session_id)
             
             if not session_id:
                 self.emit_to_client("error", {"message": "No session available"})
-                logger.error("❌ No realtime_session_id in session")
+                logger.error("❌ No realtime session for sid %s", request.sid)
                 return
 
             try:
-                from pitext_travel.api.realtime.session_manager import get_session_manager
-                from pitext_travel.api.realtime.function_handler import create_function_handler
-
-                manager = get_session_manager()
+                manager = self.manager
                 realtime_session = manager.get_session(session_id)
                 if realtime_session is None:
-                    logger.error(f"❌ Session {session_id} not found in manager")
+                    logger.error("❌ Session %s not found in manager", session_id)
                     self.emit_to_client("error", {"message": "Session not found"})
                     return
 
                 # Check if session is already active
                 if realtime_session.is_active:
-                    logger.info(f"🔄 Session {session_id} already active, skipping activation")
+                    logger.info("🔄 Session %s already active, skipping activation", session_id)
+                    self.bind_realtime_session(request.sid, realtime_session)
                     self.emit_to_client(
                         "session_started",
                         {
@@ -57,35 +58,35 @@ class SessionHandler(BaseWebSocketHandler):
                 flask_session_id = session.get("_id", "anonymous")
                 existing_active = manager.get_active_session_by_flask_id(flask_session_id)
                 if existing_active and existing_active.session_id != session_id:
-                    logger.warning(f"⚠️ Another active session {existing_active.session_id} exists for Flask session {flask_session_id}")
+                    logger.warning("⚠️ Another active session %s exists for Flask session %s", existing_active.session_id, flask_session_id)
                     # Deactivate the other session first
                     manager.deactivate_session(existing_active.session_id, "replaced_by_new_session")
 
                 # Activate (ie, open WS to the OpenAI Realtime API)
-                logger.info(f"🚀 Activating session {session_id}...")
-                logger.info(f"⏱️ Starting OpenAI Realtime API connection...")
+                logger.info("🚀 Activating session %s...", session_id)
+                logger.info("⏱️ Starting OpenAI Realtime API connection...")
                 
-                activation_start = time.time()
+                activation_start = time.monotonic()
                 if not manager.activate_session(session_id):
-                    activation_duration = time.time() - activation_start
-                    logger.error(f"❌ Failed to activate session {session_id} after {activation_duration:.2f}s")
+                    activation_duration = time.monotonic() - activation_start
+                    logger.error("❌ Failed to activate session %s after %.2fs", session_id, activation_duration)
                     self.emit_to_client("error", {
                         "message": "Failed to connect to OpenAI voice service. Please try again.",
                         "details": "The voice service is temporarily unavailable or experiencing high load."
                     })
                     return
 
-                activation_duration = time.time() - activation_start
-                logger.info(f"✅ Session {session_id} activated successfully in {activation_duration:.2f}s")
+                activation_duration = time.monotonic() - activation_start
+                logger.info("✅ Session %s activated successfully in %.2fs", session_id, activation_duration)
 
                 # Create and attach function handler
-                logger.info(f"🔧 Creating function handler for session {session_id}")
+                logger.info("🔧 Creating function handler for session %s", session_id)
                 function_handler = create_function_handler(flask_session_id)
                 realtime_session.function_handler = function_handler
                 
                 # Get function definitions
                 functions = function_handler.get_function_definitions()
-                logger.info(f"🔧 Registering {len(functions)} functions with Realtime API")
+                logger.info("🔧 Registering %s functions with Realtime API", len(functions))
                 
                 # Configure the Realtime session with travel functions
                 realtime_session.client.update_session(
@@ -95,8 +96,9 @@ class SessionHandler(BaseWebSocketHandler):
                 )
 
                 # Bridge callbacks → browser
-                logger.info(f"🔗 Wiring callbacks for session {session_id}")
-                wire_realtime_callbacks(self.socketio, realtime_session, request.sid, NAMESPACE)  # type: ignore
+                logger.info("🔗 Wiring callbacks for session %s", session_id)
+                detach = wire_realtime_callbacks(self.socketio, realtime_session, request.sid, NAMESPACE)
+                self.bind_realtime_session(request.sid, realtime_session, detach)
 
                 self.emit_to_client(
                     "session_started",
@@ -110,41 +112,36 @@ class SessionHandler(BaseWebSocketHandler):
                 logger.info("✅ Realtime session %s started with %d functions", session_id, len(functions))
 
             except Exception as exc:
-                logger.error(f"❌ Error in start_session: {exc}")
+                logger.error("❌ Error in start_session: %s", exc)
                 logger.exception("Session activation error:")
                 self.handle_error(exc, "start_session")
 
         @self.socketio.on("map_ready", namespace=NAMESPACE)
         def handle_map_ready(data=None):
             """Handle map ready event with better integration."""
-            session_id = session.get("realtime_session_id")
-            if not session_id:
+            rt_session = realtime_session_by_sid.get(request.sid)
+            if rt_session is None:
                 return
+            session_id = rt_session.session_id
             
             try:
-                from pitext_travel.api.realtime.session_manager import get_session_manager
-                
-                manager = get_session_manager()
-                rt_session = manager.get_session(session_id)
-                
-                if rt_session and rt_session.client:
+                if rt_session.client:
                     # Check if welcome message already sent
-                    if hasattr(rt_session, 'welcome_sent') and rt_session.welcome_sent:
-                        logger.info(f"📍 Map ready, welcome already sent for session {session_id}")
+                    if rt_session.welcome_sent:
+                        logger.info("📍 Map ready, welcome already sent for session %s", session_id)
                         return
                     
                     # Check if we have a current itinerary to announce
-                    flask_session = session
-                    if 'current_itinerary' in flask_session:
-                        city = flask_session.get('current_city', 'your destination')
-                        days = flask_session.get('current_days', 'several')
-                        welcome_message = f"Great! I can see your {days}-day itinerary for {city} is displayed on the map. How can I help you with your trip planning?"
-                    else:
-                        welcome_message = "Hi! I'm ready to help you plan your trip. Just tell me which city you'd like to visit and for how many days."
+                    session_info = ItineraryService.get_session_info()
+                    welcome_message = VoiceService.format_voice_greeting(
+                        session_info['has_itinerary'],
+                        session_info['current_city'] or 'your destination',
+                        session_info['current_days'] or 'several'
+                    )
                     
                     rt_session.client.send_text(welcome_message)
                     rt_session.welcome_sent = True  # Mark as sent
-                    logger.info(f"📍 Map ready, sent welcome message for session {session_id}")
+                    logger.info("📍 Map ready, sent welcome message for session %s", session_id)
                     
             except Exception as exc:
                 self.handle_error(exc, "map_ready")
@@ -152,33 +149,18 @@ class SessionHandler(BaseWebSocketHandler):
         @self.socketio.on("get_stats", namespace=NAMESPACE)
         def handle_get_stats():
             """Get session statistics for debugging."""
-            session_id = session.get("realtime_session_id")
+            session_id = realtime_id_by_sid.get(request.sid)
             if session_id is None:
                 self.emit_to_client("stats", {"error": "No session"})
                 return
                 
             try:
-                from pitext_travel.api.realtime.session_manager import get_session_manager
-                
-                manager = get_session_manager()
-                realtime_session = manager.get_session(session_id)
+                realtime_session = self.manager.get_session(session_id)
                 
                 if realtime_session:
-                    stats = {
-                        "session_id": session_id,
-                        "is_active": realtime_session.is_active,
-                        "created_at": realtime_session.created_at.isoformat(),
-                        "last_activity": realtime_session.last_activity.isoformat(),
-                        "audio_sent_kb": realtime_session.audio_bytes_sent / 1024,
-                        "audio_received_kb": realtime_session.audio_bytes_received / 1024,
-                        "message_count": realtime_session.message_count,
-                        "function_calls": realtime_session.function_calls,
-                        "flask_session_data": {
-                            "has_itinerary": 'current_itinerary' in session,
-                            "current_city": session.get('current_city'),
-                            "current_days": session.get('current_days')
-                        }
-                    }
+                    self.flush_audio_tally(request.sid)
+                    stats = realtime_session.stats_snapshot()
+                    stats["flask_session_data"] = ItineraryService.get_session_info()
                     self.emit_to_client("stats", stats)
                 else:
                     self.emit_to_client("stats", {"error": "Session not found"})
@@ -9,7 +9,9 @@ const TARGET_CHANNELS    = 1;
 
 // Audio filtering to reduce feedback
 const SILENCE_THRESHOLD = 0.005;  // Minimum energy to consider as speech
-const MIN_AUDIO_LENGTH = 256;   // Reduced from 512 for faster response
+// Samples per audio_data event: ~100 ms at 24 kHz. One larger frame costs
+// the server one packet, dispatch and send_audio instead of several.
+const SEND_SAMPLES = TARGET_SAMPLE_RATE / 10;
 
 function downsampleTo24kHz(float32, inRate) {
   if (inRate === TARGET_SAMPLE_RATE) return float32;
@@ -35,11 +37,9 @@ class AudioCapture {
     this.active        = false;
     this.isEnabled     = false;  // NEW: Control when to actually send audio
 
-    // Audio filtering
+    // Captured Float32Array chunks waiting to be sent, and their total samples
     this.audioBuffer   = [];
     this.bufferSize    = 0;
-    this.lastSentTime  = 0;
-    this.sendInterval  = 50; // Increased from 25ms to 50ms for stability
 
     this.onAudioData   = null;
 
@@ -61,14 +61,12 @@ class AudioCapture {
     return energy > SILENCE_THRESHOLD;
   }
 
-  /* Convert Float32 [-1,1] → Int16 (-32768..32767) */
-  _float32ToPCM16(float32) {
-    const pcm = new Int16Array(float32.length);
+  /* Convert Float32 [-1,1] → Int16 (-32768..32767) into pcm at offset */
+  _writePCM16(float32, pcm, offset) {
     for (let i = 0; i < float32.length; i++) {
       const s = Math.max(-1, Math.min(1, float32[i]));
-      pcm[i]  = s < 0 ? s * 0x8000 : s * 0x7FFF;
+      pcm[offset + i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
     }
-    return pcm;
   }
 
   isActive() { return this.active; }
@@ -127,15 +125,13 @@ class AudioCapture {
       // Down-sample if necessary
       const float24 = downsampleTo24kHz(inputFloat, this.audioContext.sampleRate);
       
-      // Add to buffer
-      this.audioBuffer.push(...float24);
+      // Keep the chunk itself; the browser may reuse the input buffer
+      this.audioBuffer.push(float24 === inputFloat ? inputFloat.slice() : float24);
       this.bufferSize += float24.length;
 
-      // Send buffered audio periodically
-      const now = Date.now();
-      if (now - this.lastSentTime > this.sendInterval && this.bufferSize >= MIN_AUDIO_LENGTH) {
+      // Send once ~100 ms of audio has accumulated
+      if (this.bufferSize >= SEND_SAMPLES) {
         this._sendBufferedAudio();
-        this.lastSentTime = now;
       }
     };
 
@@ -147,10 +143,15 @@ class AudioCapture {
   }
 
   _sendBufferedAudio() {
-    if (this.audioBuffer.length === 0 || !this.onAudioData) return;
-
-    const float32Array = new Float32Array(this.audioBuffer);
-    const pcm16 = this._float32ToPCM16(float32Array);
+    if (this.bufferSize === 0 || !this.onAudioData) return;
+
+    // Convert every chunk straight into one contiguous PCM16 frame
+    const pcm16 = new Int16Array(this.bufferSize);
+    let offset = 0;
+    for (const chunk of this.audioBuffer) {
+      this._writePCM16(chunk, pcm16, offset);
+      offset += chunk.length;
+    }
     
     // Clear buffer
     this.audioBuffer = [];
@@ -91,8 +91,8 @@ class RealtimeController {
             // Filtered audio streaming to WebSocket
             this.audioCapture.onAudioData = (pcm16) => {
                 if (this.isConnected && this.audioCapture.isEnabled) {
-                    const b64 = this._arrayBufferToBase64(pcm16.buffer);
-                    this.wsClient.sendAudioData(b64);
+                    // Raw PCM goes out as a binary frame; no base64 step
+                    this.wsClient.sendAudioData(pcm16.buffer);
                 }
             };
         }    
@@ -236,17 +236,6 @@ class RealtimeController {
             });
         }
     }
-    
-    // Utility methods
-    
-    _arrayBufferToBase64(buffer) {
-        const bytes = new Uint8Array(buffer);
-        let binary = '';
-        for (let i = 0; i < bytes.byteLength; i++) {
-            binary += String.fromCharCode(bytes[i]);
-        }
-        return btoa(binary);
-    }
 }
 
 // Export for use in other modules
@@ -9,8 +9,8 @@ const RealtimeSetup = {
         // Filtered audio streaming to WebSocket
         controller.audioCapture.onAudioData = (pcm16) => {
             if (controller.isConnected && controller.audioCapture.isEnabled) {
-                const b64 = this._arrayBufferToBase64(pcm16.buffer);
-                controller.wsClient.sendAudioData(b64);
+                // Raw PCM goes out as a binary frame; no base64 step
+                controller.wsClient.sendAudioData(pcm16.buffer);
             }
         };
     },
@@ -117,17 +117,6 @@ const RealtimeSetup = {
         controller.wsClient.on('render_itinerary', (data) => {
             controller._trigger('render_itinerary', data);
         });
-    },
-    
-    // Utility methods
-    
-    _arrayBufferToBase64(buffer) {
-        const bytes = new Uint8Array(buffer);
-        let binary = '';
-        for (let i = 0; i < bytes.byteLength; i++) {
-            binary += String.fromCharCode(bytes[i]);
-        }
-        return btoa(binary);
     }
 };
 
@@ -88,8 +88,9 @@ class WebSocketClient {
     }
 
     sendAudioData(audioData) {
-        if (!audioData || audioData.length === 0) return false;
-        return this.emit('audio_data', { audio: audioData });
+        if (!audioData || audioData.byteLength === 0) return false;
+        // Bare ArrayBuffer: the server takes it as bytes, no envelope to parse
+        return this.emit('audio_data', audioData);
     }
 
     commitAudio() {
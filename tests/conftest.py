@@ -0,0 +1,18 @@
+# tests/conftest.py
+"""Shared fixtures for the travel planner tests."""
+import os
+
+# Modules build their OpenAI client and config at import time
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("GOOGLE_MAPS_API_KEY", "test-maps-key")
+
+import pytest
+from flask import Flask
+
+
+@pytest.fixture
+def app():
+    """Bare Flask app with a session secret, for request contexts."""
+    app = Flask(__name__)
+    app.secret_key = "test-secret"
+    return app
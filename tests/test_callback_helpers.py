@@ -0,0 +1,165 @@
+# tests/test_callback_helpers.py
+"""Realtime function-call completion: one result per call, renders queued."""
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from pitext_travel.routes.websocket.callback_helpers import wire_realtime_callbacks
+
+SID = "browser-sid"
+
+
+class FakeServer:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.emitted.append((event, data, to))
+
+
+class FakeSocketIO:
+    """Runs the flusher inline so emits are visible as soon as they queue."""
+
+    def __init__(self):
+        self.server = FakeServer()
+
+    def sleep(self, seconds):
+        pass
+
+    def start_background_task(self, target):
+        target()
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    def send_function_result(self, call_id, result):
+        self.sent.append((call_id, result))
+
+
+class FakeFunctionHandler:
+    """Completes submitted calls with a canned result, or a submit error."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.pending = []
+
+    def submit_function_call(self, call_id, name, args):
+        if self.error is not None:
+            raise self.error
+        future = Future()
+        self.pending.append(future)
+        return future
+
+    def finish(self):
+        for future in self.pending:
+            future.set_result(dict(self.result))
+
+
+@pytest.fixture
+def socketio():
+    return FakeSocketIO()
+
+
+def wire(socketio, function_handler):
+    realtime_session = SimpleNamespace(
+        session_id="realtime-1",
+        client=FakeClient(),
+        function_handler=function_handler,
+        itinerary=None,
+    )
+    detach = wire_realtime_callbacks(socketio, realtime_session, SID)
+    return realtime_session, detach
+
+
+def renders(socketio):
+    return [(data, to) for event, data, to in socketio.server.emitted if event == "render_itinerary"]
+
+
+def test_plan_trip_sends_one_result_and_queues_the_render(socketio):
+    tree = {"days": [{"day": 1, "stops": []}]}
+    fh = FakeFunctionHandler({"success": True, "city": "Rome", "days": 1, "_itinerary": tree})
+    realtime_session, _ = wire(socketio, fh)
+
+    realtime_session.client.on_function_call("call-1", "plan_trip", {"city": "Rome", "days": 1})
+    # Nothing goes out until the pool finishes the call
+    assert realtime_session.client.sent == []
+    fh.finish()
+
+    assert len(realtime_session.client.sent) == 1
+    call_id, result = realtime_session.client.sent[0]
+    assert call_id == "call-1"
+    assert "_itinerary" not in result
+    assert realtime_session.itinerary.data == tree
+
+    [(payload, to)] = renders(socketio)
+    assert to == SID
+    assert payload["itinerary"] == tree
+    assert payload["city"] == "Rome"
+
+
+def test_failing_post_processing_sends_one_error_result(socketio):
+    # No city: storing the itinerary on the session raises
+    fh = FakeFunctionHandler({"success": True, "days": 1, "_itinerary": {"days": []}})
+    realtime_session, _ = wire(socketio, fh)
+
+    realtime_session.client.on_function_call("call-2", "plan_trip", {"days": 1})
+    fh.finish()
+
+    [(call_id, result)] = realtime_session.client.sent
+    assert call_id == "call-2"
+    assert result["success"] is False
+    assert result["function"] == "plan_trip"
+    assert renders(socketio) == []
+
+
+def test_explain_day_without_itinerary_sends_one_result(socketio):
+    fh = FakeFunctionHandler({"success": True, "needs_session_data": True, "day_number": 2})
+    realtime_session, _ = wire(socketio, fh)
+
+    realtime_session.client.on_function_call("call-3", "explain_day", {"day_number": 2})
+    fh.finish()
+
+    [(call_id, result)] = realtime_session.client.sent
+    assert call_id == "call-3"
+    assert result["success"] is False
+
+
+def test_submit_error_sends_one_error_result(socketio):
+    realtime_session, _ = wire(socketio, FakeFunctionHandler(error=RuntimeError("pool closed")))
+
+    realtime_session.client.on_function_call("call-4", "plan_trip", {})
+
+    [(call_id, result)] = realtime_session.client.sent
+    assert call_id == "call-4"
+    assert result == {
+        "success": False,
+        "error": "pool closed",
+        "call_id": "call-4",
+        "function": "plan_trip",
+    }
+
+
+def test_missing_function_handler_sends_one_error_result(socketio):
+    realtime_session, _ = wire(socketio, None)
+
+    realtime_session.client.on_function_call("call-5", "plan_trip", {})
+
+    [(call_id, result)] = realtime_session.client.sent
+    assert call_id == "call-5"
+    assert result["error"] == "Function handler not available"
+
+
+def test_detached_connection_still_answers_but_skips_the_render(socketio):
+    fh = FakeFunctionHandler({"success": True, "city": "Rome", "days": 1, "_itinerary": {"days": []}})
+    realtime_session, detach = wire(socketio, fh)
+
+    realtime_session.client.on_function_call("call-6", "plan_trip", {"city": "Rome", "days": 1})
+    detach()
+    fh.finish()
+
+    assert len(realtime_session.client.sent) == 1
+    assert renders(socketio) == []
@@ -0,0 +1,80 @@
+# tests/test_itinerary_store.py
+"""Server-side itinerary store: TTL expiry and LRU eviction."""
+import pytest
+from flask import session
+
+from pitext_travel.api.services import itinerary_service
+from pitext_travel.api.services.itinerary_service import ItineraryService
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    itinerary_service._itinerary_store.clear()
+    yield
+    itinerary_service._itinerary_store.clear()
+
+
+def test_store_round_trip_keeps_only_the_id_in_the_session(app):
+    itinerary = {"days": [{"day": 1, "stops": []}]}
+    with app.test_request_context():
+        ItineraryService.store_in_session(itinerary, "Paris", 1)
+        assert set(session) == {"current_itinerary_id", "current_city", "current_days"}
+        assert ItineraryService.get_from_session() == itinerary
+        assert ItineraryService.get_session_info()["has_itinerary"] is True
+
+
+def test_reads_return_independent_copies():
+    itinerary_id = itinerary_service._store_put({"days": []})
+    itinerary_service._store_get(itinerary_id)["days"].append("mutated")
+    assert itinerary_service._store_get(itinerary_id) == {"days": []}
+
+
+def test_expired_entry_is_dropped(app, monkeypatch):
+    monkeypatch.setattr(itinerary_service, "_ITINERARY_TTL_SECONDS", -1)
+    with app.test_request_context():
+        ItineraryService.store_in_session({"days": []}, "Rome", 2)
+        assert ItineraryService.get_session_info()["has_itinerary"] is False
+        assert ItineraryService.get_from_session() is None
+    assert not itinerary_service._itinerary_store
+
+
+def test_read_refreshes_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(itinerary_service.time, "monotonic", lambda: now[0])
+    itinerary_id = itinerary_service._store_put({"days": []})
+
+    now[0] += itinerary_service._ITINERARY_TTL_SECONDS - 1
+    assert itinerary_service._store_get(itinerary_id) == {"days": []}
+
+    # Past the original deadline, but within the refreshed one
+    now[0] += 2
+    assert itinerary_service._store_get(itinerary_id) == {"days": []}
+
+    now[0] += itinerary_service._ITINERARY_TTL_SECONDS + 1
+    assert itinerary_service._store_get(itinerary_id) is None
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(itinerary_service, "_ITINERARY_STORE_SIZE", 2)
+    first = itinerary_service._store_put({"days": [1]})
+    second = itinerary_service._store_put({"days": [2]})
+
+    # Reading the first makes the second the oldest
+    assert itinerary_service._store_get(first) is not None
+    third = itinerary_service._store_put({"days": [3]})
+
+    assert itinerary_service._store_get(second) is None
+    assert itinerary_service._store_get(first) == {"days": [1]}
+    assert itinerary_service._store_get(third) == {"days": [3]}
+
+
+def test_storing_again_replaces_the_previous_entry(app):
+    with app.test_request_context():
+        ItineraryService.store_in_session({"days": [1]}, "Paris", 1)
+        ItineraryService.store_in_session({"days": [2]}, "Paris", 2)
+        assert len(itinerary_service._itinerary_store) == 1
+        assert ItineraryService.get_from_session() == {"days": [2]}
+
+        ItineraryService.clear_session()
+        assert not itinerary_service._itinerary_store
+        assert ItineraryService.get_from_session() is None
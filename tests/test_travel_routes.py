@@ -0,0 +1,102 @@
+# tests/test_travel_routes.py
+"""HTTP itinerary route: default body ETag and POST validation."""
+import os
+
+import pytest
+from flask import Flask
+
+from pitext_travel.api.services import itinerary_service
+from pitext_travel.routes import travel
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "pitext_travel")
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Record itinerary generation calls instead of hitting the LLM."""
+    calls = []
+
+    def fake_itinerary(city, days):
+        calls.append((city, days))
+        return [{"day": day + 1, "stops": []} for day in range(days)]
+
+    monkeypatch.setattr(travel, "cached_trip_itinerary", fake_itinerary)
+    itinerary_service._itinerary_store.clear()
+    yield calls
+    itinerary_service._itinerary_store.clear()
+
+
+@pytest.fixture
+def client(generated):
+    app = Flask(__name__)
+    app.secret_key = "test-secret"
+    app.register_blueprint(travel.create_travel_blueprint(PACKAGE_DIR))
+    return app.test_client()
+
+
+def test_default_itinerary_carries_an_etag(client, generated):
+    response = client.get("/travel/api/itinerary")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    assert response.headers["ETag"].startswith('"')
+    assert response.get_json()["metadata"] == {"city": "Paris", "days": 3}
+    assert generated == [("Paris", 3)]
+
+
+def test_matching_etag_gets_304_without_regenerating(client, generated):
+    etag = client.get("/travel/api/itinerary").headers["ETag"]
+
+    response = client.get("/travel/api/itinerary", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert generated == [("Paris", 3)]
+
+
+def test_stale_etag_gets_the_full_body(client):
+    etag = client.get("/travel/api/itinerary").headers["ETag"]
+
+    response = client.get("/travel/api/itinerary", headers={"If-None-Match": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+    assert len(response.get_json()["days"]) == 3
+
+
+def test_stored_itinerary_is_served_instead_of_the_default(client):
+    client.post("/travel/api/itinerary", json={"city": "Rome", "days": 2})
+
+    response = client.get("/travel/api/itinerary")
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert response.get_json()["metadata"] == {"city": "Rome", "days": 2}
+
+
+@pytest.mark.parametrize("requested, expected", [
+    (0, 1),
+    (-5, 1),
+    (1, 1),
+    (7, 7),
+    (14, 14),
+    (15, 14),
+    (1000, 14),
+    ("4", 4),
+    ("lots", 3),
+    (None, 3),
+])
+def test_post_clamps_days_before_generating(client, generated, requested, expected):
+    response = client.post("/travel/api/itinerary", json={"city": "Rome", "days": requested})
+
+    assert response.status_code == 200
+    assert response.get_json()["metadata"] == {"city": "Rome", "days": expected}
+    assert generated == [("Rome", expected)]
+
+
+def test_post_without_days_defaults_to_three(client, generated):
+    response = client.post("/travel/api/itinerary", json={"city": "Lisbon"})
+
+    assert response.status_code == 200
+    assert generated == [("Lisbon", 3)]